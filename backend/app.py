@@ -1,7 +1,17 @@
+import os
+from dotenv import load_dotenv
 from flask import Flask, jsonify
 from flask_cors import CORS
 import backend.classes.aiven as aiven
-from sqlalchemy import select
+import backend.classes.compression as compression
+import backend.classes.conditional as conditional
+from backend.classes.health import HealthProbe
+from backend.classes.json_provider import FastJSONProvider
+from backend.classes.metrics import Metrics
+from backend.classes.profiler import RequestProfiler
+from backend.classes.query_stats import QueryStats
+from backend.classes.response_cache import ResponseCache
+from backend.classes.slow_queries import SlowQueryLog
 from backend.routes.products import init_routes as init_products
 from backend.routes.adresse import init_routes as init_adresse
 from backend.routes.person import init_routes as init_person
@@ -16,70 +26,174 @@ from backend.routes.anhang import init_routes as init_anhang
 from backend.routes.wichtigkeit import init_routes as init_wichtigkeit
 from backend.routes.auftrag import init_routes as init_auftrag
 from backend.routes.auftragsposition import init_routes as init_auftragsposition
+from backend.routes.admin import init_routes as init_admin
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-
-# Initialize database connection
-aiven_env = aiven.AivenEnvironment()
-db = aiven.AivenDatabase(aiven_env)
-db.connect()
-
-# Register blueprints
-app.register_blueprint(init_products(db))
-app.register_blueprint(init_adresse(db))
-app.register_blueprint(init_person(db))
-app.register_blueprint(init_unternehmen(db))
-app.register_blueprint(init_kontakt(db))
-app.register_blueprint(init_terminart(db))
-app.register_blueprint(init_termine(db))
-app.register_blueprint(init_protokoll(db))
-app.register_blueprint(init_teilnehmer(db))
-app.register_blueprint(init_medium(db))
-app.register_blueprint(init_anhang(db))
-app.register_blueprint(init_wichtigkeit(db))
-app.register_blueprint(init_auftrag(db))
-app.register_blueprint(init_auftragsposition(db))
-
-
-@app.route('/')
-def home():
-    """Home endpoint"""
-    return jsonify({
-        "message": "Welcome to mobsys-backend-api",
-        "version": "0.1.0",
-        "endpoints": {
-            "/": "Home",
-            "/health": "Health check",
-            "/api/products": "Products API",
-            "/api/adresse": "Addresses API",
-            "/api/person": "Persons API",
-            "/api/unternehmen": "Companies API",
-            "/api/kontakt": "Contacts API",
-            "/api/terminart": "Appointment Types API",
-            "/api/termine": "Appointments API",
-            "/api/protokoll": "Protocols API",
-            "/api/teilnehmer": "Participants API",
-            "/api/medium": "Media API",
-            "/api/anhang": "Attachments API",
-            "/api/wichtigkeit": "Importance Levels API",
-            "/api/auftrag": "Orders API",
-            "/api/auftragsposition": "Order Items API"
-        }
-    })
-
-
-@app.route('/health')
-def health():
-    """Health check endpoint"""
+# Settings with these prefixes can be set as environment variables (or in .env)
+ENV_SETTING_PREFIXES = (
+    'REFERENCE_CACHE_', 'RESPONSE_CACHE_', 'COMPRESS_', 'QUERY_STATS_', 'SLOW_QUERY_',
+    'PROFILER_', 'METRICS_', 'HEALTH_',
+)
+
+
+def _parse_env_value(value: str):
+    """Convert an environment variable to a bool, number or string setting."""
+    if value.lower() in ('true', 'yes', 'on'):
+        return True
+    if value.lower() in ('false', 'no', 'off', ''):
+        return False
     try:
-        # Test database connection
-        with db.session as session:
-            session.execute(select(1))
-        return jsonify({"status": "healthy", "database": "connected"}), 200
-    except Exception as e:
-        return jsonify({"status": "unhealthy", "error": str(e)}), 503
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def settings_from_env(prefixes=ENV_SETTING_PREFIXES) -> dict:
+    """Settings taken from environment variables starting with one of the prefixes."""
+    return {
+        name: _parse_env_value(value)
+        for name, value in os.environ.items()
+        if name.startswith(prefixes)
+    }
+
+
+def create_app(config: dict = None) -> Flask:
+    """
+    Create and configure the Flask application.
+
+    The database engine is created lazily on the first request that needs it,
+    so creating the app does not touch the network. Settings are read from
+    the environment after loading the .env file (variables that are already
+    set take precedence).
+
+    Args:
+        config: optional settings applied to app.config, e.g.
+            {"DATABASE_URL": "sqlite:///test.db"} to use another database
+            instead of Aiven (also read from the DATABASE_URL environment variable).
+            They take precedence over the environment variables.
+
+    Returns:
+        Flask: the configured application
+    """
+    load_dotenv()
+
+    app = Flask(__name__)
+    app.config.from_mapping(
+        DATABASE_URL=os.getenv('DATABASE_URL'),
+        REFERENCE_CACHE_TTL=300,
+        ADMIN_TOKEN=os.getenv('ADMIN_TOKEN'),
+    )
+    app.config.update(settings_from_env())
+    if config:
+        app.config.update(config)
+
+    app.json = FastJSONProvider(app)  # orjson-backed, serializes dates and Decimals
+    CORS(app)  # Enable CORS for all routes
+
+    # Database connection, established on first use
+    db = aiven.AivenDatabase(
+        url=app.config['DATABASE_URL'],
+        reference_ttl=app.config['REFERENCE_CACHE_TTL']
+    )
+    app.extensions['aiven_db'] = db
+
+    # Database check in a background thread, read by the health endpoints
+    health_probe = HealthProbe(db)
+    health_probe.init_app(app)
+
+    # Register blueprints
+    app.register_blueprint(init_products(db))
+    app.register_blueprint(init_adresse(db))
+    app.register_blueprint(init_person(db))
+    app.register_blueprint(init_unternehmen(db))
+    app.register_blueprint(init_kontakt(db))
+    app.register_blueprint(init_terminart(db))
+    app.register_blueprint(init_termine(db))
+    app.register_blueprint(init_protokoll(db))
+    app.register_blueprint(init_teilnehmer(db))
+    app.register_blueprint(init_medium(db))
+    app.register_blueprint(init_anhang(db))
+    app.register_blueprint(init_wichtigkeit(db))
+    app.register_blueprint(init_auftrag(db))
+    app.register_blueprint(init_auftragsposition(db))
+    app.register_blueprint(init_admin(db))
+
+    # Per-fingerprint latency percentiles, served by /admin/slow-queries
+    SlowQueryLog().init_app(app, db)
+
+    # Opt-in cProfile per request; registered first so the profile covers
+    # every other before/after_request hook
+    RequestProfiler().init_app(app)
+
+    # Query count / N+1 warnings (staging); registered before the cache so its
+    # headers are never stored in the response cache
+    QueryStats().init_app(app, db)
+
+    # Prometheus /metrics; its before_request must run before cache hits short-circuit
+    Metrics().init_app(app, db)
+
+    # after_request hooks run in reverse order: cache, then ETag / 304, then compression
+    compression.init_app(app)
+
+    # ETag / 304 handling; registered before the cache so it runs after it
+    conditional.init_app(app)
+
+    # Cache GET responses, invalidated by writes through the blueprints
+    ResponseCache().init_app(app)
+
+    @app.route('/')
+    def home():
+        """Home endpoint"""
+        return jsonify({
+            "message": "Welcome to mobsys-backend-api",
+            "version": "0.1.0",
+            "endpoints": {
+                "/": "Home",
+                "/health": "Health check",
+                "/health/live": "Liveness probe",
+                "/health/ready": "Readiness probe",
+                "/metrics": "Prometheus metrics",
+                "/api/products": "Products API",
+                "/api/adresse": "Addresses API",
+                "/api/person": "Persons API",
+                "/api/unternehmen": "Companies API",
+                "/api/kontakt": "Contacts API",
+                "/api/terminart": "Appointment Types API",
+                "/api/termine": "Appointments API",
+                "/api/protokoll": "Protocols API",
+                "/api/teilnehmer": "Participants API",
+                "/api/medium": "Media API",
+                "/api/anhang": "Attachments API",
+                "/api/wichtigkeit": "Importance Levels API",
+                "/api/auftrag": "Orders API",
+                "/api/auftragsposition": "Order Items API"
+            }
+        })
+
+    @app.route('/health')
+    def health():
+        """Health check endpoint, answered from the cached database probe"""
+        database = health_probe.status()["database"]
+        if database["status"] == "connected":
+            return jsonify({"status": "healthy", "database": "connected"}), 200
+        return jsonify({"status": "unhealthy", "error": database["error"]}), 503
+
+    @app.route('/health/live')
+    def health_live():
+        """Liveness probe: the process serves requests, no I/O"""
+        return jsonify({"status": "alive"}), 200
+
+    @app.route('/health/ready')
+    def health_ready():
+        """Readiness probe: database reachable (cached probe) and connection pool not exhausted"""
+        status = health_probe.status()
+        return jsonify(status), 200 if status["ready"] else 503
+
+    return app
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    create_app().run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,24 @@
+'''
+Admin token check shared by the /admin endpoints and the request flags that
+need it (e.g. '?profile=1').
+Usage:
+    if not has_admin_token():
+        return jsonify({"error": "Unauthorized"}), 401
+
+The token is configured with ADMIN_TOKEN (environment or app config) and sent
+as 'Authorization: Bearer <token>'. Without a configured token nothing is
+authorized.
+'''
+
+import hmac
+
+from flask import current_app, request
+
+
+def has_admin_token() -> bool:
+    """Check whether the current request carries the configured admin token."""
+    token = current_app.config.get('ADMIN_TOKEN')
+    if not token:
+        return False
+    scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(given.encode(), token.encode())
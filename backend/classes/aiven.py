@@ -8,14 +8,19 @@ Usage:
 
 import os
 import sys
+import threading
+import time
 try:
     import sqlalchemy
+    from sqlalchemy.orm import sessionmaker
     SQLALCHEMY_AVAILABLE = True
     from dotenv import load_dotenv
 except ImportError:
     print("Error: python-dotenv or sqlalchemy is not installed. Please install them with '(uv) pip install python-dotenv sqlalchemy'.")
     sys.exit(1)
 
+from backend.classes.reference_cache import ReferenceCache, DEFAULT_TTL
+
 class AivenEnvironment:
 
     def __init__(self):
@@ -41,6 +46,13 @@ class AivenEnvironment:
         env_variables['AIVEN_PASSWORD'] = os.getenv('AIVEN_PASSWORD')
         env_variables['AIVEN_CERT_PATH'] = os.getenv('AIVEN_CERT_PATH')
 
+        # Optional connection pool tuning (defaults are applied in the getters)
+        env_variables['AIVEN_POOL_SIZE'] = os.getenv('AIVEN_POOL_SIZE')
+        env_variables['AIVEN_MAX_OVERFLOW'] = os.getenv('AIVEN_MAX_OVERFLOW')
+        env_variables['AIVEN_POOL_RECYCLE'] = os.getenv('AIVEN_POOL_RECYCLE')
+        env_variables['AIVEN_POOL_PRE_PING'] = os.getenv('AIVEN_POOL_PRE_PING')
+        env_variables['AIVEN_POOL_TIMEOUT'] = os.getenv('AIVEN_POOL_TIMEOUT')
+
         return env_variables
 
 
@@ -103,17 +115,115 @@ class AivenEnvironment:
     def get_cert_path(self) -> str:
         """Get the Aiven certificate path."""
         return self.env_variables.get('AIVEN_CERT_PATH')
-    
+
+    def get_pool_size(self) -> int:
+        """Get the number of connections kept open in the pool."""
+        return int(self.env_variables.get('AIVEN_POOL_SIZE') or 10)
+
+    def get_max_overflow(self) -> int:
+        """Get the number of connections allowed beyond the pool size."""
+        return int(self.env_variables.get('AIVEN_MAX_OVERFLOW') or 20)
+
+    def get_pool_recycle(self) -> int:
+        """Get the connection lifetime in seconds before it is recycled."""
+        return int(self.env_variables.get('AIVEN_POOL_RECYCLE') or 1800)
+
+    def get_pool_pre_ping(self) -> bool:
+        """Get whether connections are tested before being handed out."""
+        value = self.env_variables.get('AIVEN_POOL_PRE_PING')
+        if not value:
+            return True
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+    def get_pool_timeout(self) -> int:
+        """Get the seconds to wait for a free connection from the pool."""
+        return int(self.env_variables.get('AIVEN_POOL_TIMEOUT') or 30)
+
 
 class AivenDatabase:
-    def __init__(self, env: AivenEnvironment):
+    def __init__(self, env: AivenEnvironment = None, url: str = None, reference_ttl: float = DEFAULT_TTL):
+        """
+        Args:
+            env: Aiven environment; loaded from .env on first use when omitted
+            url: alternate database URL (e.g. 'sqlite:///test.db'), replaces Aiven
+            reference_ttl: seconds reference tables (Terminart, ...) stay cached
+        """
         self.env = env
-        self.engine = None
-        self.session = None
+        self.url = url
+        self._engine = None
+        self._session_factory = None
+        self._engine_callbacks = []
+        self._query_callbacks = []
+        self._lock = threading.Lock()
+        self.reference_cache = ReferenceCache(self, reference_ttl)
+
+    @property
+    def engine(self):
+        """The pooled engine, created on first access."""
+        if self._engine is None and self.connect() is None:
+            raise RuntimeError("Database connection is not available.")
+        return self._engine
+
+    @property
+    def Session(self):
+        """
+        Session factory bound to the pooled engine, created on first access.
+        Use one session per request:
+            with db.Session() as session: ...
+        """
+        if self._session_factory is None and self.connect() is None:
+            raise RuntimeError("Database connection is not available.")
+        return self._session_factory
+
+    @property
+    def connected(self) -> bool:
+        """Whether the engine has been created yet."""
+        return self._engine is not None
+
+    def on_engine_created(self, callback):
+        """
+        Register callback(engine), called once the engine has been created, or
+        right away if it exists already. Used to attach event listeners without
+        creating the engine early.
+        """
+        with self._lock:
+            if self._engine is None:
+                self._engine_callbacks.append(callback)
+                return
+        callback(self._engine)
+
+    def on_query(self, callback):
+        """
+        Register callback(statement, elapsed, context), called after every
+        statement executed through the engine with its duration in seconds.
+        The engine is timed by one pair of cursor events, however many
+        callbacks are registered; context is the SQLAlchemy execution context
+        (connection, parameters) and may be None.
+        """
+        with self._lock:
+            first = not self._query_callbacks
+            self._query_callbacks.append(callback)
+        if first:
+            self.on_engine_created(self._time_queries)
+
+    def _time_queries(self, engine):
+        sqlalchemy.event.listen(engine, 'before_cursor_execute', self._before_execute)
+        sqlalchemy.event.listen(engine, 'after_cursor_execute', self._after_execute)
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        # A stack, since a statement can be executed while another one is being prepared
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        for callback in self._query_callbacks:
+            callback(statement, elapsed, context)
 
     def connect(self):
         """
-        Connect to Aiven database using the loaded environment variables.
+        Connect to Aiven database using the loaded environment variables,
+        or to the alternate database URL if one was given.
 
         Returns:
             connection: sqlalchemy engine object
@@ -122,17 +232,62 @@ class AivenDatabase:
             print("Error: sqlalchemy is not installed. Please install it with '(uv) pip install sqlalchemy'.")
             return None
 
-        try:
-            timeout = 10
-            self.engine = sqlalchemy.create_engine(
-                self.env.get_service_uri(),
-                connect_args={
-                    "connect_timeout": timeout,
-                    'ssl_ca': self.env.get_cert_path()
-                }
-            )
-            print("Successfully connected to the Aiven database using environment variables.")
-            self.session = sqlalchemy.orm.Session(self.engine)
-        except Exception as e:
-            print(f"Error connecting to the database using environment variables: {e}")
-            return None
+        with self._lock:
+            if self._engine is not None:
+                return self._engine
+
+            try:
+                if self.url:
+                    engine = self._create_url_engine()
+                    print("Successfully connected to the database using the configured URL.")
+                else:
+                    if self.env is None:
+                        self.env = AivenEnvironment()
+                    timeout = 10
+                    engine = sqlalchemy.create_engine(
+                        self.env.get_service_uri(),
+                        connect_args={
+                            "connect_timeout": timeout,
+                            'ssl_ca': self.env.get_cert_path()
+                        },
+                        pool_size=self.env.get_pool_size(),
+                        max_overflow=self.env.get_max_overflow(),
+                        pool_recycle=self.env.get_pool_recycle(),
+                        pool_pre_ping=self.env.get_pool_pre_ping(),
+                        pool_timeout=self.env.get_pool_timeout()
+                    )
+                    print("Successfully connected to the Aiven database using environment variables.")
+                # Listeners are attached before any session can use the engine
+                for callback in self._engine_callbacks:
+                    callback(engine)
+                self._session_factory = sessionmaker(bind=engine)
+                self._engine = engine
+                return self._engine
+            except Exception as e:
+                print(f"Error connecting to the database: {e}")
+                return None
+
+    def _create_url_engine(self):
+        if self.url.startswith('sqlite'):
+            options = {'connect_args': {'check_same_thread': False}}
+            if self.url in ('sqlite://', 'sqlite:///:memory:'):
+                # Share the single in-memory database between all sessions
+                options['poolclass'] = sqlalchemy.pool.StaticPool
+            return sqlalchemy.create_engine(self.url, **options)
+        return sqlalchemy.create_engine(self.url, pool_pre_ping=True)
+
+    def create_indexes(self):
+        """
+        Create the indexes declared in backend.classes.tables that do not exist yet.
+
+        Returns:
+            list: names of the indexes that were checked
+        """
+        from backend.classes.tables import Base
+
+        names = []
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
+                names.append(index.name)
+        return names
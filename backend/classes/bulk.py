@@ -0,0 +1,243 @@
+'''
+Bulk creation and upsert of rows for the '/api/<resource>/bulk' endpoints.
+Usage:
+    rows = parse_items(request.get_json(), schema.PRODUKT, ['name', 'price'])
+    with db.Session() as session:
+        ids = insert_rows(session, tables.Produkt, rows)
+        session.commit()
+
+All items are validated against the column types before anything is written. The rows are inserted
+in one transaction with batched statements:
+    MySQL           multi-row INSERT per batch, ids derived from the first
+                    generated id (consecutive for a single statement)
+    RETURNING       executemany INSERT ... RETURNING (MariaDB, SQLite)
+    other           ORM unit of work, still without per-row commits or re-selects
+
+upsert_rows() inserts or updates rows identified by a unique column with the
+dialect's native upsert (ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE).
+'''
+
+from datetime import datetime, timezone
+
+import sqlalchemy
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+MAX_ITEMS = 10000
+MAX_UPSERT_ITEMS = 50000
+BATCH_SIZE = 1000
+
+# Dialects with a native upsert (ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE)
+UPSERT_DIALECTS = ('mysql', 'mariadb', 'sqlite', 'postgresql')
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp for a DateTime column.
+
+    Timestamps with an offset ('2024-01-01T10:00:00Z', as sent by calendar
+    feeds) are converted to naive UTC, matching the naive values the columns
+    store. Every write path uses this, so the same input is stored the same
+    way by the single-item and the bulk endpoints, and unchanged rows compare
+    equal in upsert_rows().
+
+    Raises:
+        ValueError: if the value is not an ISO 8601 timestamp
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _convert(column, value):
+    """
+    Check a JSON value against the column type and convert it for the insert.
+
+    ISO 8601 strings are parsed for date and datetime columns, like the
+    single-item POST handlers do.
+
+    Raises:
+        ValueError: if the value does not fit the column
+    """
+    if value is None:
+        if not column.nullable:
+            raise ValueError("must not be null")
+        return None
+
+    column_type = column.type
+    if isinstance(column_type, sqlalchemy.DateTime):
+        if not isinstance(value, str):
+            raise ValueError("expected an ISO 8601 timestamp")
+        return parse_datetime(value)
+    if isinstance(column_type, sqlalchemy.Date):
+        if not isinstance(value, str):
+            raise ValueError("expected an ISO 8601 date")
+        return datetime.fromisoformat(value).date()
+    # bool is a subclass of int, but true/false are no numbers
+    if isinstance(column_type, sqlalchemy.Boolean):
+        if not isinstance(value, bool):
+            raise ValueError("expected true or false")
+    elif isinstance(column_type, sqlalchemy.Integer):
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError("expected an integer")
+    elif isinstance(column_type, sqlalchemy.Numeric):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("expected a number")
+    elif isinstance(column_type, sqlalchemy.String):
+        if not isinstance(value, str):
+            raise ValueError("expected a string")
+        if column_type.length is not None and len(value) > column_type.length:
+            raise ValueError(f"at most {column_type.length} characters")
+    return value
+
+
+def parse_items(items, resource, required, max_items: int = MAX_ITEMS) -> list:
+    """
+    Validate the request body of a bulk endpoint and map it to column values.
+
+    Args:
+        items: parsed JSON body, expected to be a list of objects
+        resource: Resource (see schema.py) mapping the JSON field names to columns
+        required: JSON field names every item must contain
+        max_items: maximum number of items accepted
+
+    Returns:
+        list: one dict per item, keyed by the mapped attribute names and
+            containing every column of the resource except the primary key
+
+    Raises:
+        ValueError: describing the first invalid item
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("Expected a non-empty JSON array")
+    if len(items) > max_items:
+        raise ValueError(f"At most {max_items} items per request")
+
+    columns = {name: column for name, column in resource.columns.items() if column is not resource.primary_key}
+    rows = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {index}: expected an object")
+        missing = [key for key in required if key not in item]
+        if missing:
+            raise ValueError(f"Item {index}: missing required fields: {', '.join(missing)}")
+        row = {}
+        for name, column in columns.items():
+            try:
+                row[column.key] = _convert(column, item.get(name))
+            except ValueError as e:
+                raise ValueError(f"Item {index}: field '{name}': {e}")
+        rows.append(row)
+    return rows
+
+
+def insert_rows(session, table, rows) -> list:
+    """
+    Insert rows in the current transaction and return their generated ids in input order.
+
+    Args:
+        session: Session, committed by the caller
+        table: mapped class to insert into
+        rows: dicts keyed by attribute name, as returned by parse_items()
+
+    Returns:
+        list: the new primary keys
+    """
+    dialect = session.get_bind().dialect
+    if dialect.name == 'mysql' and not dialect.insert_executemany_returning:
+        return _insert_mysql(session, table, rows)
+
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = session.execute(insert(table).returning(table.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+
+    entities = [table(**row) for row in rows]
+    session.add_all(entities)
+    session.flush()
+    return [entity.id for entity in entities]
+
+
+def _insert_mysql(session, table, rows) -> list:
+    # A multi-row INSERT is a "simple insert" for InnoDB: its auto-increment
+    # values are allocated in one step, so they are consecutive (in steps of
+    # auto_increment_increment) starting at the reported first id
+    increment = session.execute(text('SELECT @@auto_increment_increment')).scalar()
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        first_id = session.execute(insert(table).values(batch)).lastrowid
+        ids.extend(first_id + i * increment for i in range(len(batch)))
+    return ids
+
+
+def upsert_rows(session, table, rows, key: str) -> dict:
+    """
+    Insert or update rows identified by a unique column, in the current transaction.
+
+    The existing rows are read first (one IN query per batch) to count the
+    changes and to skip rows whose values are already stored. The remaining
+    rows are written with the native upsert, so rows inserted concurrently
+    by someone else are updated instead of failing.
+
+    Args:
+        session: Session, committed by the caller
+        table: mapped class with a unique index on key
+        rows: dicts keyed by attribute name, as returned by parse_items()
+        key: attribute name of the unique column; for duplicates within rows
+            the last one wins
+
+    Returns:
+        dict: numbers of 'inserted', 'updated' and 'unchanged' rows
+
+    Raises:
+        RuntimeError: if the database has no native upsert (see UPSERT_DIALECTS),
+            before anything is read or written
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise RuntimeError(f"Upsert is not supported for {dialect}. Supported databases: {', '.join(UPSERT_DIALECTS)}.")
+
+    by_key = {row[key]: row for row in rows}
+    key_column = getattr(table, key)
+
+    names = list(rows[0])
+    columns = [getattr(table, name) for name in names]
+
+    # Plain tuples instead of entities: only compared, never modified
+    keys = list(by_key)
+    existing = {}
+    for start in range(0, len(keys), BATCH_SIZE):
+        for values in session.execute(select(*columns).where(key_column.in_(keys[start:start + BATCH_SIZE]))):
+            stored = dict(zip(names, values))
+            existing[stored[key]] = stored
+
+    changed = [
+        row for value, row in by_key.items()
+        if value not in existing or existing[value] != row
+    ]
+    inserted = sum(1 for row in changed if row[key] not in existing)
+
+    for start in range(0, len(changed), BATCH_SIZE):
+        session.execute(_upsert_statement(dialect, table, changed[start:start + BATCH_SIZE], key))
+
+    return {
+        "inserted": inserted,
+        "updated": len(changed) - inserted,
+        "unchanged": len(by_key) - len(changed)
+    }
+
+
+def _upsert_statement(dialect: str, table, batch, key: str):
+    columns = [name for name in batch[0] if name != key]
+
+    if dialect in ('mysql', 'mariadb'):
+        statement = mysql.insert(table).values(batch)
+        return statement.on_duplicate_key_update({name: statement.inserted[name] for name in columns})
+
+    module = sqlite if dialect == 'sqlite' else postgresql
+    statement = module.insert(table).values(batch)
+    return statement.on_conflict_do_update(
+        index_elements=[getattr(table, key)],
+        set_={name: statement.excluded[name] for name in columns}
+    )
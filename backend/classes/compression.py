@@ -0,0 +1,121 @@
+'''
+Negotiated response compression (br / gzip) driven by Accept-Encoding.
+Usage:
+    init_app(app)
+
+Text responses (JSON, NDJSON, text/*) above a minimum size are compressed
+with the best encoding the client accepts. Streamed responses are compressed
+chunk by chunk and flushed after every chunk, so NDJSON lines still reach the
+client as soon as they are produced. Brotli is used when the brotli package is
+installed ('(uv) pip install brotli'), gzip otherwise.
+
+The compressed variant gets its own ETag ('<etag>-gzip', '<etag>-br'), as
+required for strong validators, and every compressible response carries
+'Vary: Accept-Encoding' so shared caches keep the variants apart.
+
+Settings (app.config, or environment variables of the same name):
+    COMPRESS_ENABLED    default True
+    COMPRESS_MIN_SIZE   bytes below which bodies are sent as-is, default 500
+    COMPRESS_LEVEL      gzip level 1-9, default 6
+    COMPRESS_BR_LEVEL   brotli quality 0-11, default 4
+'''
+
+import zlib
+
+from flask import current_app, request
+
+from backend.classes.conditional import variant_etag
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'application/javascript')
+
+
+def _is_compressible(response) -> bool:
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _negotiate() -> str:
+    """Pick the best encoding the client accepts, or None for identity."""
+    offers = ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+    return request.accept_encodings.best_match(offers)
+
+
+def _compressor(encoding: str):
+    """
+    Create an incremental compressor for the encoding.
+
+    Returns:
+        tuple: (compress(chunk) -> bytes, flush() -> bytes, finish() -> bytes)
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=current_app.config['COMPRESS_BR_LEVEL'])
+        return compressor.process, compressor.flush, compressor.finish
+
+    # wbits 31 = 16 + 15: deflate with a gzip header and trailer
+    compressor = zlib.compressobj(current_app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _compress_stream(chunks, compressor):
+    # The compressor is created by the caller: the generator runs after the app context is gone
+    compress, flush, finish = compressor
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(response):
+    """after_request hook: compress the body with the negotiated encoding."""
+    if not _is_compressible(response) or response.direct_passthrough:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate()
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    if response.status_code == 304:
+        # The body was dropped, but the validator must name the variant the client holds
+        if etag is not None and request.if_none_match.contains(variant_etag(etag, encoding)):
+            response.set_etag(variant_etag(etag, encoding), weak)
+        return response
+    if response.status_code < 200 or response.status_code == 204:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, _compressor(encoding))
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        compress, _, finish = _compressor(encoding)
+        response.set_data(compress(body) + finish())
+
+    response.headers['Content-Encoding'] = encoding
+    if etag is not None:
+        response.set_etag(variant_etag(etag, encoding), weak)
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+
+    if app.config['COMPRESS_ENABLED']:
+        app.after_request(compress_response)
@@ -0,0 +1,74 @@
+'''
+ETag / If-None-Match support for all GET endpoints.
+Usage:
+    init_app(app)
+
+Every successful GET response gets a strong ETag computed from its body.
+When the client's If-None-Match matches, the body is dropped and
+'304 Not Modified' is returned. Responses served from the response cache
+carry the ETag stored with the entry, so they are answered without hashing
+or serializing anything, and a matching cache hit is answered with 304
+before the view runs (see response_cache.py). Compressed variants carry
+'<etag>-<encoding>' and are matched against the same body.
+'''
+
+import hashlib
+
+from flask import request
+
+# Content-Encodings whose variants carry a suffixed ETag (see compression.py)
+ENCODINGS = ('gzip', 'br')
+
+
+def ensure_etag(response):
+    """Set a strong ETag computed from the body unless the response has one already."""
+    etag, _ = response.get_etag()
+    if etag is None:
+        etag = hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()
+        response.set_etag(etag)
+    return etag
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """ETag of the variant of a response sent with the given Content-Encoding."""
+    return f"{etag}-{encoding}"
+
+
+def _matches_variant(etag: str) -> bool:
+    """Check If-None-Match against the compressed variants of the ETag."""
+    if_none_match = request.if_none_match
+    return any(
+        if_none_match.contains(variant_etag(etag, encoding))
+        for encoding in ENCODINGS
+    )
+
+
+def matches(etag: str) -> bool:
+    """Check If-None-Match against the identity ETag and its compressed variants."""
+    return request.if_none_match.contains(etag) or _matches_variant(etag)
+
+
+def _is_cacheable(response) -> bool:
+    return (
+        request.method in ('GET', 'HEAD')
+        and response.status_code == 200
+        and not response.is_streamed
+        and not response.direct_passthrough
+    )
+
+
+def conditional_response(response):
+    """after_request hook: add the ETag and answer matching If-None-Match with 304."""
+    if not _is_cacheable(response):
+        return response
+
+    etag = ensure_etag(response)
+    if _matches_variant(etag):
+        # The client holds a compressed variant of the same body; compare as identity
+        environ = dict(request.environ, HTTP_IF_NONE_MATCH=f'"{etag}"')
+        return response.make_conditional(environ)
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    app.after_request(conditional_response)
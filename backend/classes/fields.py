@@ -0,0 +1,149 @@
+'''
+Sparse fieldsets ('?fields=') and relation expansion ('?expand=') for the GET
+endpoints.
+Usage:
+    fields = FieldSelection.from_request(request.args, schema.PROTOKOLL)
+    query = select(tables.Protokoll).options(*fields.load_only())
+    protocol_data = fields.serialize(protocol)
+    if 'termin' in fields:
+        ...
+
+'fields' is a comma separated list of the JSON field names of a resource,
+e.g. 'fields=id,tldr,datum'. Only the columns behind the requested fields
+are loaded (load_only), so large columns such as Protokoll.Text are never
+read from the database unless asked for. Without 'fields' every column field
+is returned. The primary key is always included.
+
+Nested objects are only attached when they are expanded, e.g.
+'expand=termin,termin.art'; a dotted path expands its parents as well.
+Otherwise just the foreign key id is returned and the relation is neither
+joined nor resolved. Naming a nested object in 'fields' ('termin' or
+'termin.title') expands it too.
+'''
+
+from sqlalchemy.orm import load_only
+
+
+class Resource:
+    """JSON fields of a table and the nested objects that can be attached to it."""
+
+    def __init__(self, columns: dict, relations: dict = None):
+        """
+        Args:
+            columns: JSON field name -> mapped column
+            relations: JSON field name of a nested object or computed value
+                -> (column or tuple of columns needed to resolve it, Resource
+                of the nested object or None if it cannot be narrowed)
+        """
+        self.columns = columns
+        self.relations = relations or {}
+        self.primary_key = columns['id']
+
+
+class FieldSelection:
+
+    def __init__(self, resource: Resource, requested=None, expand=frozenset()):
+        self.resource = resource
+        # None means every field
+        self.requested = requested
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, args, resource: Resource, extra=()):
+        """
+        Create the selection from the 'fields' and 'expand' query parameters.
+
+        Args:
+            args: request.args
+            resource: Resource of the endpoint
+            extra: additional field names the endpoint computes itself
+
+        Raises:
+            ValueError: if a field or relation does not exist
+        """
+        expand = _split(args.get('expand'))
+        for path in expand:
+            if not cls._is_valid(resource, path, columns=False):
+                raise ValueError(f"Unknown relation '{path}'")
+
+        if args.get('fields') is None:
+            return cls(resource, expand=expand)
+
+        requested = _split(args.get('fields'))
+        for name in requested:
+            if name not in extra and not cls._is_valid(resource, name):
+                raise ValueError(f"Unknown field '{name}'")
+        return cls(resource, requested, expand)
+
+    @staticmethod
+    def _is_valid(resource: Resource, name: str, columns: bool = True) -> bool:
+        head, _, rest = name.partition('.')
+        if not rest:
+            return head in resource.relations or (columns and head in resource.columns)
+        if head not in resource.relations:
+            return False
+        nested = resource.relations[head][1]
+        return nested is not None and FieldSelection._is_valid(nested, rest, columns)
+
+    def __contains__(self, name: str) -> bool:
+        """Check whether a column field is selected or a nested object is expanded."""
+        if name in self.resource.relations:
+            return _mentions(self.expand, name) or (self.requested is not None and _mentions(self.requested, name))
+        return self.requested is None or name in self.requested
+
+    def nested(self, name: str) -> 'FieldSelection':
+        """Selection for the nested object 'name', narrowed by dotted field and relation names."""
+        resource = self.resource.relations[name][1]
+        prefix = name + '.'
+        expand = {path[len(prefix):] for path in self.expand if path.startswith(prefix)}
+        requested = None
+        if self.requested is not None and name not in self.requested:
+            # Without dotted names every field of the nested object is returned
+            requested = {field[len(prefix):] for field in self.requested if field.startswith(prefix)} or None
+        return FieldSelection(resource, requested, expand)
+
+    def columns(self, *required) -> list:
+        """Columns needed for the selected fields, plus the given required columns."""
+        columns = [self.resource.primary_key]
+        for name, column in self.resource.columns.items():
+            if name in self:
+                columns.append(column)
+        for name, (needed, _) in self.resource.relations.items():
+            if name in self:
+                columns.extend(needed if isinstance(needed, tuple) else (needed,))
+        columns.extend(required)
+        # Drop duplicates, keeping the order
+        return list({column.key: column for column in columns}.values())
+
+    def load_only(self, *required) -> list:
+        """
+        Loader options restricting the loaded columns to the selected fields.
+
+        Args:
+            required: columns the endpoint needs besides the fields, e.g. the
+                pagination keys
+
+        Returns:
+            list: [load_only(...)], or [] when every field is selected
+        """
+        if self.requested is None:
+            return []
+        return [load_only(*self.columns(*required))]
+
+    def serialize(self, obj) -> dict:
+        """Serialize the selected column fields of obj (nested objects are added by the caller)."""
+        data = {"id": getattr(obj, self.resource.primary_key.key)}
+        for name, column in self.resource.columns.items():
+            if name in self:
+                data[name] = getattr(obj, column.key)
+        return data
+
+
+def _split(value) -> set:
+    if value is None:
+        return set()
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def _mentions(names, name: str) -> bool:
+    return name in names or any(other.startswith(name + '.') for other in names)
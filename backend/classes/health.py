@@ -0,0 +1,146 @@
+'''
+Cached database probe for the readiness endpoints.
+Usage:
+    probe = HealthProbe(db)
+    probe.init_app(app)
+    status = probe.status()
+
+A background thread (started by the first status() call) checks the database
+every HEALTH_PROBE_INTERVAL seconds with 'SELECT 1' on a pooled connection.
+status() only reads the last result, so load balancer probes at any
+frequency cost no I/O and never wait for a slow database. The probe is
+time-bounded from the caller's side: a check running longer than
+HEALTH_PROBE_TIMEOUT, or a result older than one interval plus the timeout,
+makes the database count as unavailable.
+
+The status also reports how saturated the connection pool is. Once
+HEALTH_POOL_MAX_SATURATION of all connections (pool size plus overflow) are
+checked out, the worker reports itself as not ready, so traffic goes to
+workers that can still serve it.
+
+Settings (app.config, or environment variables of the same name):
+    HEALTH_PROBE_INTERVAL       seconds between checks, default 5
+    HEALTH_PROBE_TIMEOUT        seconds a check may take, default 2
+    HEALTH_POOL_MAX_SATURATION  fraction of connections in use above which
+                                the worker is not ready, default 1.0
+'''
+
+import threading
+import time
+
+from sqlalchemy import select
+
+
+class HealthProbe:
+
+    def __init__(self, db):
+        self.db = db
+        self.interval = 5.0
+        self.timeout = 2.0
+        self.max_saturation = 1.0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._first_result = threading.Event()
+        # Replaced as a whole by the probe thread, so readers see a consistent result
+        self._result = None
+        self._probe_started = None
+
+    def init_app(self, app):
+        app.config.setdefault('HEALTH_PROBE_INTERVAL', 5)
+        app.config.setdefault('HEALTH_PROBE_TIMEOUT', 2)
+        app.config.setdefault('HEALTH_POOL_MAX_SATURATION', 1.0)
+
+        self.interval = app.config['HEALTH_PROBE_INTERVAL']
+        self.timeout = app.config['HEALTH_PROBE_TIMEOUT']
+        self.max_saturation = app.config['HEALTH_POOL_MAX_SATURATION']
+        app.extensions['health_probe'] = self
+
+    def _ensure_started(self):
+        # Started lazily, in the worker process that serves the requests
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='health-probe', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._probe()
+            self._first_result.set()
+            time.sleep(self.interval)
+
+    def _probe(self):
+        self._probe_started = start = time.monotonic()
+        try:
+            with self.db.engine.connect() as connection:
+                connection.execute(select(1))
+            result = {"ok": True, "error": None}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        finally:
+            self._probe_started = None
+        result["checked"] = time.monotonic()
+        result["latency"] = result["checked"] - start
+        self._result = result
+
+    def _database_status(self) -> dict:
+        now = time.monotonic()
+        result = self._result
+        started = self._probe_started
+        if started is not None and now - started > self.timeout:
+            return {"status": "timeout", "error": f"Probe running for {now - started:.1f}s"}
+        if result is None:
+            return {"status": "unknown", "error": "Not probed yet"}
+        if now - result["checked"] > self.interval + self.timeout:
+            return {"status": "stale", "error": f"Last probe {now - result['checked']:.1f}s ago"}
+
+        status = {
+            "status": "connected" if result["ok"] else "error",
+            "latency_ms": round(result["latency"] * 1000, 1),
+            "checked_seconds_ago": round(now - result["checked"], 1)
+        }
+        if not result["ok"]:
+            status["error"] = result["error"]
+        return status
+
+    def _pool_status(self):
+        """Connections in use of a queue pool, None for pools without a size (SQLite)."""
+        if not self.db.connected:
+            return None
+        pool = self.db.engine.pool
+        if not hasattr(pool, 'checkedout'):
+            return None
+
+        checked_out = pool.checkedout()
+        # QueuePool keeps max_overflow private; -1 means unlimited
+        max_overflow = getattr(pool, '_max_overflow', 0)
+        capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+        return {
+            "size": pool.size(),
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": max_overflow,
+            "saturation": round(checked_out / capacity, 3) if capacity else None
+        }
+
+    def status(self) -> dict:
+        """
+        Readiness of this worker, without touching the database.
+
+        Waits up to HEALTH_PROBE_TIMEOUT for the very first probe only.
+
+        Returns:
+            dict: {"ready": bool, "database": {...}, "pool": {...} or None}
+        """
+        self._ensure_started()
+        self._first_result.wait(self.timeout)
+
+        database = self._database_status()
+        pool = self._pool_status()
+        saturated = pool is not None and pool["saturation"] is not None and pool["saturation"] >= self.max_saturation
+        return {
+            "ready": database["status"] == "connected" and not saturated,
+            "database": database,
+            "pool": pool
+        }
@@ -0,0 +1,68 @@
+'''
+JSON provider for the Flask app.
+Usage:
+    app.json = FastJSONProvider(app)
+
+Uses orjson when it is installed ('(uv) pip install orjson') and falls back to
+the standard library otherwise. Both paths serialize datetime and date as
+ISO 8601 strings and Decimal as a number, so routes can return column values
+unchanged.
+'''
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(o):
+    """Serialize the types returned by SQLAlchemy columns that JSON does not know."""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+
+    default = staticmethod(_default)
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        # orjson only supports compact or 2-space output; anything else goes to json
+        if ORJSON_AVAILABLE and set(kwargs) <= {'separators', 'indent'} and kwargs.get('indent') in (None, 2):
+            return orjson.dumps(obj, default=_default, option=self._orjson_options(bool(kwargs.get('indent')))).decode('utf-8')
+
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not ORJSON_AVAILABLE:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._orjson_options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,154 @@
+'''
+Prometheus metrics for requests, SQL statements and the connection pool.
+Usage:
+    Metrics().init_app(app, db)
+
+Exposed at GET /metrics in the Prometheus text format:
+    http_requests_total                 by blueprint, endpoint, method, status
+    http_request_duration_seconds       histogram by blueprint, endpoint, method
+    http_requests_in_progress           requests being handled right now
+    db_query_duration_seconds           histogram by statement type (SELECT, ...)
+    db_pool_size                        configured connections of the pool
+    db_pool_checked_out                 connections currently in use
+    db_pool_overflow                    connections opened beyond the pool size
+
+The endpoint label is the Flask endpoint ('products.get_products'), never the
+path, so ids in URLs do not create new series. Streamed responses are
+measured until their headers are sent.
+
+Under gunicorn every worker writes its samples to the directory named by the
+PROMETHEUS_MULTIPROC_DIR environment variable, and /metrics aggregates the
+files of all workers. 'main.py serve' sets this up (a fresh temporary
+directory unless the variable is set) and removes the files of exited
+workers. Requires the prometheus_client package ('uv sync --extra metrics').
+
+Settings (app.config, or environment variables of the same name):
+    METRICS_ENABLED     default True when prometheus_client is installed
+'''
+
+import os
+import time
+
+from flask import Response, g, request
+from sqlalchemy import event
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+if PROMETHEUS_AVAILABLE:
+    # Created once per process; the multiprocess mode of the gauges decides
+    # how the values of the workers are combined
+    REQUESTS = Counter(
+        'http_requests_total', "HTTP requests handled",
+        ['blueprint', 'endpoint', 'method', 'status']
+    )
+    REQUEST_DURATION = Histogram(
+        'http_request_duration_seconds', "Time spent handling a request",
+        ['blueprint', 'endpoint', 'method'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    )
+    IN_PROGRESS = Gauge(
+        'http_requests_in_progress', "HTTP requests being handled",
+        multiprocess_mode='livesum'
+    )
+    QUERY_DURATION = Histogram(
+        'db_query_duration_seconds', "Time spent executing a SQL statement",
+        ['operation'],
+        buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+    )
+    POOL_SIZE = Gauge('db_pool_size', "Configured size of the connection pool", multiprocess_mode='livesum')
+    POOL_CHECKED_OUT = Gauge('db_pool_checked_out', "Connections in use", multiprocess_mode='livesum')
+    POOL_OVERFLOW = Gauge('db_pool_overflow', "Connections opened beyond the pool size", multiprocess_mode='livesum')
+
+# Statement types reported as the 'operation' label; anything else is 'OTHER'
+OPERATIONS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def _operation(statement: str) -> str:
+    operation = statement.lstrip()[:6].upper()
+    return operation if operation in OPERATIONS else 'OTHER'
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # A fresh registry per scrape, filled from the files of all workers
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def mark_process_dead(pid: int):
+    """gunicorn child_exit hook: drop the live gauges of an exited worker."""
+    if PROMETHEUS_AVAILABLE and 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+class Metrics:
+
+    def init_app(self, app, db):
+        app.config.setdefault('METRICS_ENABLED', PROMETHEUS_AVAILABLE)
+        if not app.config['METRICS_ENABLED']:
+            return
+        if not PROMETHEUS_AVAILABLE:
+            raise RuntimeError("METRICS_ENABLED requires the prometheus_client package. Please install it with '(uv) pip install prometheus-client'.")
+
+        db.on_query(self._observe_query)
+        db.on_engine_created(self._listen)
+        app.before_request(self._start)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish)
+        app.add_url_rule('/metrics', 'metrics', self._export)
+
+    def _listen(self, engine):
+        pool = engine.pool
+        # Only queue pools (MySQL) have a size; SQLite's single connection has none
+        if hasattr(pool, 'checkedout'):
+            POOL_SIZE.set(pool.size())
+            event.listen(pool, 'checkout', lambda *args: self._update_pool(pool, pool.checkedout()))
+            # Fired before the pool takes the connection back
+            event.listen(pool, 'checkin', lambda *args: self._update_pool(pool, pool.checkedout() - 1))
+
+    @staticmethod
+    def _update_pool(pool, checked_out: int):
+        POOL_CHECKED_OUT.set(checked_out)
+        # Connections beyond the pool size are closed when they are returned
+        POOL_OVERFLOW.set(max(checked_out - pool.size(), 0))
+
+    @staticmethod
+    def _observe_query(statement, elapsed, context):
+        QUERY_DURATION.labels(_operation(statement)).observe(elapsed)
+
+    @staticmethod
+    def _start():
+        g.metrics_start = time.perf_counter()
+        IN_PROGRESS.inc()
+
+    @staticmethod
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @staticmethod
+    def _finish(exc):
+        """teardown_request hook: also runs for unhandled exceptions, which end as 500."""
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        IN_PROGRESS.dec()
+
+        # Unmatched URLs share one label instead of creating a series per path
+        endpoint = request.endpoint or '<unmatched>'
+        blueprint = request.blueprint or ''
+        REQUESTS.labels(blueprint, endpoint, request.method, str(g.pop('metrics_status', 500))).inc()
+        REQUEST_DURATION.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - start)
+
+    @staticmethod
+    def _export():
+        """Prometheus scrape endpoint"""
+        return Response(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
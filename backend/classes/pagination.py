@@ -0,0 +1,162 @@
+'''
+Keyset (cursor) pagination for the collection endpoints.
+Usage:
+    page = KeysetPagination.from_request(request.args, tables.Person.id)
+    persons = page.trim(session.execute(page.apply(select(tables.Person))).scalars().all())
+    return jsonify({"persons": ..., "next": page.next})
+
+Clients pass '?limit=' and then the returned 'next' value as '?after=' to
+fetch the following page. Without 'limit' the first DEFAULT_LIMIT rows are
+returned, so no request loads an unbounded number of rows (complete exports
+use the NDJSON streaming mode, see streaming.py).
+
+Key columns are ascending by default; pass 'column.desc()' for a descending
+key. A computed key (e.g. an aggregate of a joined subquery) is passed as a
+labeled expression selected by the query; its value is read from the result
+row instead of the mapped object:
+    importance = func.coalesce(subquery.c.wichtigkeit, -1).label('wichtigkeit_id')
+    page = KeysetPagination.from_request(request.args, importance.desc(), tables.Termine.id)
+'''
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import Label, UnaryExpression
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def _unwrap(key):
+    """(expression, descending) of a key column given as 'column' or 'column.desc()'."""
+    if isinstance(key, UnaryExpression) and key.modifier is operators.desc_op:
+        return key.element, True
+    return key, False
+
+
+class KeysetPagination:
+
+    def __init__(self, key_columns, limit=DEFAULT_LIMIT, after=None):
+        self.key_columns = key_columns
+        self.limit = limit
+        self.after = after
+        self.next = None
+
+    @classmethod
+    def from_request(cls, args, *key_columns):
+        """
+        Build the pagination from the 'limit' and 'after' query parameters.
+
+        Raises:
+            ValueError: if limit is not a positive integer or the cursor is invalid
+        """
+        limit = args.get('limit')
+        after = args.get('after')
+
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise ValueError("Invalid 'limit' parameter, expected an integer")
+            if limit < 1:
+                raise ValueError("Invalid 'limit' parameter, expected a positive integer")
+            limit = min(limit, MAX_LIMIT)
+        else:
+            limit = DEFAULT_LIMIT
+
+        if after is not None:
+            after = decode_cursor(after, key_columns)
+
+        return cls(key_columns, limit, after)
+
+    def apply(self, query):
+        """
+        Restrict a select() to the requested page.
+
+        Orders by the key columns (replacing any previous ordering), skips
+        everything up to and including the cursor and fetches one extra row
+        to detect whether a next page exists.
+        """
+        if self.after is not None:
+            query = query.where(self._after_clause())
+        return query.order_by(None).order_by(*self.key_columns).limit(self.limit + 1)
+
+    def trim(self, rows, entity=None):
+        """
+        Drop the look-ahead row and remember the cursor for the next page.
+
+        Args:
+            rows: result rows of the query returned by apply()
+            entity: optional callable returning the mapped object of a row,
+                for queries selecting more than one entity
+
+        Returns:
+            list: the rows of the current page
+        """
+        rows = list(rows)
+        if len(rows) <= self.limit:
+            self.next = None
+            return rows
+
+        rows = rows[:self.limit]
+        last = rows[-1]
+        values = []
+        for key in self.key_columns:
+            column, _ = _unwrap(key)
+            # Labeled expressions are columns of the row, not of the mapped object
+            source = last if isinstance(column, Label) or entity is None else entity(last)
+            values.append(getattr(source, column.key))
+        self.next = encode_cursor(values)
+        return rows
+
+    def _after_clause(self):
+        # (a, b) > (x, y) expanded to a > x OR (a = x AND b > y), which every
+        # backend can serve from an index on the key columns; '<' for
+        # descending keys. Labels are compared by their expression, since
+        # WHERE cannot refer to them.
+        keys = []
+        for key in self.key_columns:
+            column, descending = _unwrap(key)
+            keys.append((column.element if isinstance(column, Label) else column, descending))
+
+        clauses = []
+        for i, (column, descending) in enumerate(keys):
+            equal = [keys[j][0] == self.after[j] for j in range(i)]
+            beyond = column < self.after[i] if descending else column > self.after[i]
+            clauses.append(and_(*equal, beyond))
+        return or_(*clauses)
+
+
+def encode_cursor(values) -> str:
+    """Encode key values into an opaque, URL-safe cursor."""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, key_columns) -> list:
+    """
+    Decode a cursor produced by encode_cursor() for the given key columns.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(key_columns):
+            raise ValueError
+        values = []
+        for value, key in zip(payload, key_columns):
+            python_type = _unwrap(key)[0].type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError):
+        raise ValueError("Invalid 'after' cursor")
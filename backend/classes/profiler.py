@@ -0,0 +1,168 @@
+'''
+Opt-in cProfile profiling of individual requests.
+Usage:
+    RequestProfiler().init_app(app)
+
+A request is profiled when
+    - it sends 'X-Profile: 1' or '?profile=1' together with the admin token
+      ('Authorization: Bearer <ADMIN_TOKEN>', see admin_auth.py), or
+    - it is picked at random with probability PROFILER_SAMPLE_RATE.
+The profile covers the view and the request hooks (cache, ETag, compression)
+and is written as a pstats file to PROFILER_DIR. Only the newest
+PROFILER_MAX_FILES profiles are kept, so the directory never grows beyond a
+fixed size, also when several workers share it. The response carries the
+profile id in 'X-Profile-Id'.
+
+Profiles are listed and downloaded through /admin/profiles (see
+routes/admin.py). The .prof files open with 'python -m pstats' or snakeviz.
+
+Settings (app.config, or environment variables of the same name):
+    PROFILER_ENABLED        default False
+    PROFILER_SAMPLE_RATE    fraction of all requests profiled, default 0.0
+    PROFILER_DIR            default '<tempdir>/mobsys-profiles'
+    PROFILER_MAX_FILES      default 50
+'''
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from flask import g, request
+
+from backend.classes.admin_auth import has_admin_token
+
+SUFFIX = '.prof'
+
+# <milliseconds>-<pid>-<endpoint>; also guards downloads against path tricks
+PROFILE_ID = re.compile(r'^(\d+)-(\d+)-([\w.]+)$')
+
+
+class RequestProfiler:
+
+    def __init__(self):
+        self.directory = None
+        self.sample_rate = 0.0
+        self.max_files = 50
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_ENABLED', False)
+        app.config.setdefault('PROFILER_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'mobsys-profiles'))
+        app.config.setdefault('PROFILER_MAX_FILES', 50)
+
+        app.extensions['profiler'] = self
+        if not app.config['PROFILER_ENABLED']:
+            return
+
+        self.directory = app.config['PROFILER_DIR']
+        self.sample_rate = app.config['PROFILER_SAMPLE_RATE']
+        self.max_files = app.config['PROFILER_MAX_FILES']
+        os.makedirs(self.directory, exist_ok=True)
+
+        app.before_request(self._start)
+        app.after_request(self._stop)
+        app.teardown_request(self._abort)
+
+    def _wants_profile(self) -> bool:
+        flag = request.headers.get('X-Profile') or request.args.get('profile')
+        if flag in ('1', 'true') and has_admin_token():
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start(self):
+        if not self._wants_profile():
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another thread of this process is being profiled (Python 3.12+
+            # allows a single profiler at a time); skip this request
+            return None
+        g.profile = profile
+        return None
+
+    def _stop(self, response):
+        """after_request hook, registered first so it runs last."""
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.disable()
+            response.headers['X-Profile-Id'] = self._save(profile)
+        return response
+
+    def _abort(self, exc):
+        # after_request is skipped for unhandled exceptions; keep their profile too
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.disable()
+            self._save(profile)
+
+    def _save(self, profile) -> str:
+        endpoint = re.sub(r'[^\w.]', '_', request.endpoint or 'unmatched')
+        profile_id = f"{int(time.time() * 1000)}-{os.getpid()}-{endpoint}"
+        profile.dump_stats(os.path.join(self.directory, profile_id + SUFFIX))
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        for name in self._names()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Removed by another worker in the meantime
+                pass
+
+    def _names(self) -> list:
+        """Profile file names, newest first."""
+        names = [
+            name for name in os.listdir(self.directory)
+            if name.endswith(SUFFIX) and PROFILE_ID.match(name[:-len(SUFFIX)])
+        ]
+        return sorted(names, key=lambda name: int(name.split('-', 1)[0]), reverse=True)
+
+    def profiles(self) -> list:
+        """Metadata of the stored profiles, newest first."""
+        profiles = []
+        for name in self._names():
+            profile_id = name[:-len(SUFFIX)]
+            match = PROFILE_ID.match(profile_id)
+            try:
+                size = os.path.getsize(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            profiles.append({
+                "id": profile_id,
+                "created": datetime.fromtimestamp(int(match.group(1)) / 1000, timezone.utc),
+                "pid": int(match.group(2)),
+                "endpoint": match.group(3),
+                "size": size
+            })
+        return profiles
+
+    def path(self, profile_id: str) -> str:
+        """
+        Path of a stored profile.
+
+        Raises:
+            FileNotFoundError: if the profiler is disabled, the id is malformed
+                or the profile was pruned
+        """
+        if self.directory is None or PROFILE_ID.match(profile_id) is None:
+            raise FileNotFoundError(profile_id)
+        path = os.path.join(self.directory, profile_id + SUFFIX)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(profile_id)
+        return path
+
+    def report(self, profile_id: str, sort: str = 'cumulative', limit: int = 50) -> str:
+        """pstats text report of a stored profile, the top entries by sort."""
+        output = io.StringIO()
+        stats = pstats.Stats(self.path(profile_id), stream=output)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
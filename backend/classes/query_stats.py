@@ -0,0 +1,109 @@
+'''
+Per-request query counting and N+1 detection.
+Usage:
+    QueryStats().init_app(app, db)
+
+Every SQL statement executed while handling a request is counted and timed
+(see AivenDatabase.on_query()). The totals are sent back as response headers:
+    X-Query-Count: 12
+    Server-Timing: db;dur=8.4;desc="12 queries"
+
+Statements are grouped by their shape (see fingerprint()); when one shape
+runs more than QUERY_STATS_N_PLUS_ONE times within a request, a warning with
+the endpoint and the statement is logged. That is the typical trace of a
+query issued in a loop over the rows of another one.
+
+Meant for development and staging, therefore off by default.
+
+Settings (app.config, or environment variables of the same name):
+    QUERY_STATS_ENABLED     default False
+    QUERY_STATS_N_PLUS_ONE  repetitions of one statement shape per request
+                            that are reported, default 10
+'''
+
+import logging
+import re
+from collections import Counter
+
+from flask import current_app, g, has_app_context, request
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PARAMETER = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Reduce a SQL statement to its shape, so that executions differing only in
+    their values are grouped together.
+
+    Literals and bound parameters become '?', parameter lists (IN, VALUES)
+    become '(...)' whatever their length, and whitespace is collapsed.
+
+    Args:
+        statement: SQL as sent to the database
+
+    Returns:
+        str: e.g. 'SELECT ... FROM Person WHERE Person.id IN (...)'
+    """
+    shape = _STRING.sub('?', statement)
+    shape = _PARAMETER.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _LIST.sub('(...)', shape)
+    shape = _ROWS.sub('(...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryStats:
+
+    def init_app(self, app, db):
+        app.config.setdefault('QUERY_STATS_ENABLED', False)
+        app.config.setdefault('QUERY_STATS_N_PLUS_ONE', 10)
+
+        if not app.config['QUERY_STATS_ENABLED']:
+            return
+        db.on_query(self._record)
+        app.before_request(self._start)
+        app.after_request(self._report)
+
+    @staticmethod
+    def _record(statement, elapsed, context):
+        # Queries outside of a request (startup, background threads) are not counted
+        if not has_app_context() or 'query_stats' not in g:
+            return
+        stats = g.query_stats
+        stats['count'] += 1
+        stats['time'] += elapsed
+        stats['shapes'][fingerprint(statement)] += 1
+
+    @staticmethod
+    def _start():
+        g.query_stats = {'count': 0, 'time': 0.0, 'shapes': Counter()}
+
+    @staticmethod
+    def _report(response):
+        """after_request hook: add the headers and report repeated statements."""
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+
+        # Streamed bodies run their queries after the headers are sent
+        if not response.is_streamed:
+            response.headers['X-Query-Count'] = str(stats['count'])
+            response.headers.add(
+                'Server-Timing', f'db;dur={stats["time"] * 1000:.1f};desc="{stats["count"]} queries"'
+            )
+
+        threshold = current_app.config['QUERY_STATS_N_PLUS_ONE']
+        for shape, count in stats['shapes'].items():
+            if count > threshold:
+                logger.warning(
+                    "Possible N+1: %s %s executed the same statement %d times: %s",
+                    request.method, request.path, count, shape
+                )
+        return response
@@ -0,0 +1,61 @@
+'''
+In-process read-through cache for small reference tables.
+Usage:
+    art = db.reference_cache.get(tables.Terminart, termin.Art)
+    db.reference_cache.invalidate(tables.Terminart)  # after writes
+
+A table is loaded completely on first use and kept until its TTL expires or
+it is invalidated. Cached rows are detached ORM objects and must be treated
+as read-only.
+'''
+
+import threading
+import time
+
+from sqlalchemy import select
+
+DEFAULT_TTL = 300
+
+
+class ReferenceCache:
+
+    def __init__(self, db, ttl: float = DEFAULT_TTL):
+        """
+        Args:
+            db: AivenDatabase used to load the tables
+            ttl: seconds a loaded table stays valid
+        """
+        self.db = db
+        self.ttl = ttl
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def get(self, table, row_id):
+        """Get a row of a reference table by id, or None if it does not exist."""
+        if row_id is None:
+            return None
+        return self.rows(table).get(row_id)
+
+    def rows(self, table) -> dict:
+        """Get all rows of a reference table as a dict keyed by id."""
+        entry = self._tables.get(table)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        with self._lock:
+            entry = self._tables.get(table)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+            with self.db.Session() as session:
+                rows = {row.id: row for row in session.execute(select(table)).scalars()}
+            self._tables[table] = (time.monotonic() + self.ttl, rows)
+            return rows
+
+    def invalidate(self, table=None):
+        """Drop a cached table, or all cached tables if none is given."""
+        with self._lock:
+            if table is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(table, None)
@@ -0,0 +1,252 @@
+'''
+Response cache for the GET endpoints with write-driven invalidation.
+Usage:
+    ResponseCache().init_app(app)
+
+Cached responses are keyed by path and query string and tagged with the
+tables their blueprint reads (READS). Every successful write through a
+blueprint bumps the version of the tables it writes (WRITES), which makes
+all entries tagged with them unreachable. Because the tag versions are part
+of the key, invalidation never has to enumerate entries and works the same
+for the in-memory and the shared (Redis) backend.
+
+The ETag of a cached response is the hash of its body (see conditional.py),
+stored with the entry. A cache hit whose ETag matches If-None-Match is
+answered with 304 right away; on a miss the view runs and the body decides.
+The key includes a generation token of the backend, so versions that restart
+at 0 (new process, evicted or flushed Redis keys) never reach old entries.
+
+The cache fails open: when the backend is unreachable (e.g. a Redis outage)
+the error is logged and requests are served uncached. Invalidations lost
+that way are bounded by RESPONSE_CACHE_TTL.
+
+Settings (app.config, or environment variables of the same name):
+    RESPONSE_CACHE_ENABLED      default True
+    RESPONSE_CACHE_TTL          seconds an entry stays valid, default 30
+    RESPONSE_CACHE_MAX_ENTRIES  size of the in-memory LRU, default 1024
+    RESPONSE_CACHE_URL          'redis://...' to share the cache between
+                                worker processes (requires the redis package)
+'''
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import Response, g, request
+
+from backend.classes.conditional import ensure_etag, matches
+from backend.classes.streaming import wants_stream
+
+logger = logging.getLogger(__name__)
+
+# Tables read by the GET handlers of each blueprint
+READS = {
+    'products': ('Produkt',),
+    'adresse': ('Adresse',),
+    'person': ('Person', 'Adresse'),
+    'unternehmen': ('Unternehmen', 'Adresse'),
+    'kontakt': ('Kontakt', 'Person', 'Unternehmen', 'Adresse'),
+    'terminart': ('Terminart',),
+    'termine': ('Termine', 'Terminart', 'Auftrag'),
+    'protokoll': ('Protokoll', 'Termine', 'Terminart'),
+    'teilnehmer': ('Teilnehmer', 'Kontakt', 'Termine', 'Terminart'),
+    'medium': ('Medium',),
+    'anhang': ('Anhang', 'Protokoll', 'Medium'),
+    'wichtigkeit': ('Wichtigkeit',),
+    # '?expand=totals' aggregates the order items and their product prices
+    'auftrag': ('Auftrag', 'Wichtigkeit', 'Kontakt', 'Auftragsposition', 'Produkt'),
+    'auftragsposition': ('Auftragsposition', 'Auftrag', 'Produkt'),
+}
+
+# Tables modified by the POST/PUT/DELETE handlers of each blueprint
+WRITES = {
+    'products': ('Produkt',),
+    'adresse': ('Adresse',),
+    'person': ('Person',),
+    'unternehmen': ('Unternehmen',),
+    'kontakt': ('Kontakt',),
+    'terminart': ('Terminart',),
+    'termine': ('Termine',),
+    'protokoll': ('Protokoll',),
+    'teilnehmer': ('Teilnehmer',),
+    'medium': ('Medium',),
+    'anhang': ('Anhang',),
+    'wichtigkeit': ('Wichtigkeit',),
+    # POST /api/auftrag also creates the order items
+    'auftrag': ('Auftrag', 'Auftragsposition'),
+    'auftragsposition': ('Auftragsposition',),
+}
+
+
+class MemoryBackend:
+    """Per-process LRU cache with TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Kept apart from the LRU so a version is never evicted and reset
+        self._versions = {}
+        self._generation = uuid.uuid4().hex
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_versions(self, tags):
+        """Return (generation, versions of the tags)."""
+        with self._lock:
+            return self._generation, [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._generation = uuid.uuid4().hex
+
+
+class RedisBackend:
+    """Cache shared by all worker processes through Redis."""
+
+    def __init__(self, url: str, prefix: str = 'mobsys:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL requires the redis package. Please install it with '(uv) pip install redis'.")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + 'entry:' + key)
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + 'entry:' + key, int(ttl), value)
+
+    def get_versions(self, tags):
+        """Return (generation, versions of the tags)."""
+        generation_key = self.prefix + 'generation'
+        generation, *values = self.client.mget([generation_key] + [self.prefix + 'version:' + tag for tag in tags])
+        if generation is None:
+            # First use or flushed: the versions restart, so start a new generation
+            self.client.setnx(generation_key, uuid.uuid4().hex)
+            generation = self.client.get(generation_key)
+        return generation.decode('ascii'), [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tags):
+        pipeline = self.client.pipeline()
+        for tag in tags:
+            pipeline.incr(self.prefix + 'version:' + tag)
+        pipeline.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.ttl = 30
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 30)
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('RESPONSE_CACHE_URL', None)
+
+        app.extensions['response_cache'] = self
+        if not app.config['RESPONSE_CACHE_ENABLED']:
+            return
+
+        self.ttl = app.config['RESPONSE_CACHE_TTL']
+        if self.backend is None:
+            if app.config['RESPONSE_CACHE_URL']:
+                self.backend = RedisBackend(app.config['RESPONSE_CACHE_URL'])
+            else:
+                self.backend = MemoryBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+
+        app.before_request(self._lookup)
+        app.after_request(self._store_or_invalidate)
+
+    def invalidate(self, *tables):
+        """Invalidate all cached responses that read any of the given tables."""
+        if self.backend is None:
+            return
+        try:
+            self.backend.bump(tables)
+        except Exception as e:
+            logger.warning("Response cache unavailable, invalidation of %s skipped: %s", ', '.join(tables), e)
+
+    def _cache_key(self, tags):
+        generation, versions = self.backend.get_versions(tags)
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f"{request.path}?{query}|{generation}|" + ','.join(f"{tag}:{version}" for tag, version in zip(tags, versions))
+
+    def _lookup(self):
+        if request.method != 'GET' or request.blueprint not in READS or wants_stream(request):
+            return None
+
+        try:
+            key = self._cache_key(READS[request.blueprint])
+            entry = None if 'no-cache' in request.headers.get('Cache-Control', '') else self.backend.get(key)
+        except Exception as e:
+            logger.warning("Response cache unavailable, lookup skipped: %s", e)
+            return None
+        g.response_cache_key = key
+        if entry is None:
+            return None
+
+        mimetype, etag, body = entry.split(b'\n', 2)
+        etag = etag.decode('ascii')
+        g.response_cache_hit = True
+        if matches(etag):
+            # The client holds the cached body already
+            response = Response(status=304)
+        else:
+            response = Response(body, status=200, mimetype=mimetype.decode('ascii'))
+            response.headers['X-Cache'] = 'HIT'
+        response.set_etag(etag)
+        return response
+
+    def _store_or_invalidate(self, response):
+        if request.method == 'GET':
+            key = g.pop('response_cache_key', None)
+            if key is None or g.pop('response_cache_hit', False):
+                return response
+            if response.status_code == 200 and not response.is_streamed:
+                # The ETag is stored with the entry so hits can answer If-None-Match directly
+                etag = ensure_etag(response)
+                entry = b'\n'.join([response.mimetype.encode('ascii'), etag.encode('ascii'), response.get_data()])
+                try:
+                    self.backend.set(key, entry, self.ttl)
+                except Exception as e:
+                    logger.warning("Response cache unavailable, store skipped: %s", e)
+                    return response
+                response.headers['X-Cache'] = 'MISS'
+        elif request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+            self.invalidate(*WRITES.get(request.blueprint, ()))
+        return response
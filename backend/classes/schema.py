@@ -0,0 +1,138 @@
+'''
+JSON field names of every resource, mapped to their columns.
+Usage:
+    fields = FieldSelection.from_request(request.args, schema.PERSON)
+
+Used by FieldSelection to decide which columns to load and to serialize
+entities, so a field is named the same wherever it appears, top-level or
+nested.
+'''
+
+import backend.classes.tables as tables
+from backend.classes.fields import Resource
+
+ADRESSE = Resource({
+    "id": tables.Adresse.id,
+    "plz": tables.Adresse.Plz,
+    "ortsname": tables.Adresse.ortsname,
+    "strasse": tables.Adresse.Strasse,
+    "hausnr": tables.Adresse.Hausnr,
+})
+
+PERSON = Resource({
+    "id": tables.Person.id,
+    "name": tables.Person.Name,
+    "adresse_id": tables.Person.Adresse,
+    "geburtsdatum": tables.Person.Geburtsdatum,
+    "titel": tables.Person.Titel,
+}, {
+    "adresse": (tables.Person.Adresse, ADRESSE),
+})
+
+UNTERNEHMEN = Resource({
+    "id": tables.Unternehmen.id,
+    "name": tables.Unternehmen.Name,
+    "adresse_id": tables.Unternehmen.Adresse,
+    "umsatz": tables.Unternehmen.Umsatz,
+}, {
+    "adresse": (tables.Unternehmen.Adresse, ADRESSE),
+})
+
+KONTAKT = Resource({
+    "id": tables.Kontakt.id,
+    "email": tables.Kontakt.EMail,
+    "telefonnummer": tables.Kontakt.Telefonnummer,
+    "rolle": tables.Kontakt.Rolle,
+    "person_id": tables.Kontakt.PersonId,
+    "unternehmen_id": tables.Kontakt.UnternehmenId,
+    "ref_typ": tables.Kontakt.RefTyp,
+}, {
+    # Person or Unternehmen depending on RefTyp, always returned in full
+    "referenz_data": ((tables.Kontakt.PersonId, tables.Kontakt.UnternehmenId, tables.Kontakt.RefTyp), None),
+})
+
+TERMINART = Resource({
+    "id": tables.Terminart.id,
+    "name": tables.Terminart.Name,
+})
+
+TERMINE = Resource({
+    "id": tables.Termine.id,
+    "title": tables.Termine.Titel,
+    "ort": tables.Termine.Ort,
+    "art_id": tables.Termine.Art,
+    "start": tables.Termine.Start,
+    "ende": tables.Termine.Ende,
+    "uid": tables.Termine.Uid,
+}, {
+    "art": (tables.Termine.Art, TERMINART),
+})
+
+PROTOKOLL = Resource({
+    "id": tables.Protokoll.id,
+    "datum": tables.Protokoll.Datum,
+    "text": tables.Protokoll.Text,
+    "dauer": tables.Protokoll.Dauer,
+    "tldr": tables.Protokoll.TLDR,
+    "termin_id": tables.Protokoll.Termin,
+}, {
+    "termin": (tables.Protokoll.Termin, TERMINE),
+})
+
+TEILNEHMER = Resource({
+    "id": tables.Teilnehmer.id,
+    "kontakt_id": tables.Teilnehmer.Kontakt,
+    "termin_id": tables.Teilnehmer.Termin,
+    "istHaupt": tables.Teilnehmer.istHaupt,
+}, {
+    "kontakt": (tables.Teilnehmer.Kontakt, Resource(KONTAKT.columns)),
+    "termin": (tables.Teilnehmer.Termin, TERMINE),
+})
+
+MEDIUM = Resource({
+    "id": tables.Medium.id,
+    "dateityp": tables.Medium.Dateityp,
+    "dateiname": tables.Medium.Dateiname,
+})
+
+ANHANG = Resource({
+    "id": tables.Anhang.id,
+    "protokoll_id": tables.Anhang.Protokoll,
+    "medium_id": tables.Anhang.Medium,
+}, {
+    "protokoll": (tables.Anhang.Protokoll, Resource(PROTOKOLL.columns)),
+    "medium": (tables.Anhang.Medium, MEDIUM),
+})
+
+PRODUKT = Resource({
+    "id": tables.Produkt.id,
+    "name": tables.Produkt.Bezeichnung,
+    "price": tables.Produkt.Preis,
+})
+
+WICHTIGKEIT = Resource({
+    "id": tables.Wichtigkeit.id,
+    "level": tables.Wichtigkeit.level,
+})
+
+AUFTRAG = Resource({
+    "id": tables.Auftrag.id,
+    "bezeichnung": tables.Auftrag.Bezeichnung,
+    "wichtigkeit_id": tables.Auftrag.wichtigkeit,
+    "kontakt_id": tables.Auftrag.Kontakt,
+    "termin_id": tables.Auftrag.terminid,
+}, {
+    "wichtigkeit": (tables.Auftrag.wichtigkeit, WICHTIGKEIT),
+    "kontakt": (tables.Auftrag.Kontakt, Resource(KONTAKT.columns)),
+    # position_count and total, aggregated from the order items
+    "totals": ((), None),
+})
+
+AUFTRAGSPOSITION = Resource({
+    "id": tables.Auftragsposition.id,
+    "auftrag_id": tables.Auftragsposition.Auftrag,
+    "produkt_id": tables.Auftragsposition.Produkt,
+}, {
+    "auftrag": (tables.Auftragsposition.Auftrag, Resource(AUFTRAG.columns)),
+    "produkt": (tables.Auftragsposition.Produkt, PRODUKT),
+})
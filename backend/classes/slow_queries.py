@@ -0,0 +1,190 @@
+'''
+Slow query log with per-statement latency percentiles and EXPLAIN capture.
+Usage:
+    SlowQueryLog().init_app(app, db)
+    current_app.extensions['slow_query_log'].top(20, sort='p95_ms')
+
+Every statement executed through the engine is timed and grouped by its
+fingerprint (see query_stats.fingerprint()), so 'WHERE id = 1' and
+'WHERE id = 2' are one entry. For each fingerprint the last
+SLOW_QUERY_WINDOW durations are kept to report rolling p50/p95/p99.
+
+Executions slower than SLOW_QUERY_THRESHOLD_MS are logged as warnings. With
+SLOW_QUERY_EXPLAIN the query plan of the first slow execution of a SELECT
+is captured on the same connection and with the same parameters
+(EXPLAIN on MySQL, EXPLAIN QUERY PLAN on SQLite), so it reflects the data
+and indexes the statement actually ran against.
+
+The entries are served by GET /admin/slow-queries (see routes/admin.py).
+
+Settings (app.config, or environment variables of the same name):
+    SLOW_QUERY_ENABLED          default False
+    SLOW_QUERY_THRESHOLD_MS     default 200
+    SLOW_QUERY_EXPLAIN          capture query plans of slow SELECTs, default False
+    SLOW_QUERY_WINDOW           durations kept per fingerprint, default 1000
+    SLOW_QUERY_MAX_ENTRIES      fingerprints kept, least recently seen
+                                are dropped first, default 500
+'''
+
+import logging
+import math
+import threading
+from collections import OrderedDict, deque
+
+from backend.classes.query_stats import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Prefix turning a SELECT into a query plan request, per dialect
+EXPLAIN = {
+    'mysql': 'EXPLAIN ',
+    'mariadb': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+SORT_KEYS = ('total_ms', 'count', 'slow_count', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def _percentile(ordered: list, percent: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class QueryEntry:
+    """Statistics of one statement fingerprint."""
+
+    def __init__(self, fingerprint: str, window: int):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.slow_count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.durations = deque(maxlen=window)
+        self.example = None
+        self.explain = None
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.durations)
+        return {
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "slow_count": self.slow_count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+            "example": self.example,
+            "explain": self.explain,
+        }
+
+
+class SlowQueryLog:
+
+    def __init__(self):
+        self.threshold = 0.2
+        self.explain = False
+        self.window = 1000
+        self.max_entries = 500
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        app.config.setdefault('SLOW_QUERY_ENABLED', False)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 200)
+        app.config.setdefault('SLOW_QUERY_EXPLAIN', False)
+        app.config.setdefault('SLOW_QUERY_WINDOW', 1000)
+        app.config.setdefault('SLOW_QUERY_MAX_ENTRIES', 500)
+
+        app.extensions['slow_query_log'] = self
+        if not app.config['SLOW_QUERY_ENABLED']:
+            return
+
+        self.threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000
+        self.explain = app.config['SLOW_QUERY_EXPLAIN']
+        self.window = app.config['SLOW_QUERY_WINDOW']
+        self.max_entries = app.config['SLOW_QUERY_MAX_ENTRIES']
+        db.on_query(self._observe)
+
+    def _observe(self, statement, elapsed, context):
+        slow = elapsed >= self.threshold
+        entry = self._record(fingerprint(statement), elapsed, slow)
+        if not slow:
+            return
+
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, entry.fingerprint)
+        if entry.example is None:
+            # The SQL with placeholders; parameter values are never stored
+            entry.example = statement
+        if self.explain and entry.explain is None and context is not None and not context.executemany:
+            entry.explain = self._explain(context, statement)
+
+    def _record(self, key: str, elapsed: float, slow: bool) -> QueryEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = QueryEntry(key, self.window)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            entry.count += 1
+            entry.total += elapsed
+            entry.max = max(entry.max, elapsed)
+            entry.durations.append(elapsed)
+            if slow:
+                entry.slow_count += 1
+        return entry
+
+    @staticmethod
+    def _explain(context, statement: str):
+        """
+        Run EXPLAIN for a slow SELECT on the connection that executed it.
+
+        Returns:
+            list: plan rows as dicts, None if the statement cannot be explained,
+                or {"error": ...} if EXPLAIN failed
+        """
+        conn = context.root_connection
+        prefix = EXPLAIN.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith('SELECT'):
+            return None
+        # An unbuffered (streamed) result still occupies the MySQL connection
+        if context.execution_options.get('stream_results'):
+            return None
+
+        # A raw DBAPI cursor, so EXPLAIN bypasses the engine events
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, context.parameters[0])
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.warning("EXPLAIN failed: %s", e)
+            return {"error": str(e)}
+        finally:
+            cursor.close()
+
+    def top(self, limit: int = 20, sort: str = 'total_ms') -> list:
+        """
+        Statistics of the most expensive fingerprints.
+
+        Args:
+            limit: number of entries
+            sort: one of SORT_KEYS, descending
+
+        Raises:
+            ValueError: if sort is not a known key
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}', expected one of: {', '.join(SORT_KEYS)}")
+        with self._lock:
+            entries = [entry.to_dict() for entry in self._entries.values()]
+        entries.sort(key=lambda entry: entry[sort], reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,53 @@
+'''
+Streaming NDJSON responses for bulk exports of large collections.
+Usage:
+    if wants_stream(request):
+        return ndjson_response(db, select(tables.Protokoll), serialize_batch)
+
+Rows are fetched with yield_per (server-side cursor on MySQL) and written as
+one JSON object per line, so memory stays constant and the first line is sent
+as soon as the first batch arrives.
+'''
+
+from flask import Response, current_app, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+BATCH_SIZE = 500
+
+
+def wants_stream(request) -> bool:
+    """Check whether the client asked for NDJSON via '?stream=1' or the Accept header."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(db, query, serialize_batch, batch_size: int = BATCH_SIZE) -> Response:
+    """
+    Stream the entities selected by query as NDJSON.
+
+    Args:
+        db: AivenDatabase providing the session factory
+        query: select() of a single entity
+        serialize_batch: callable(session, entities) returning an iterable of
+            dicts; the session is a separate one that may be used for
+            additional lookups while the streaming cursor is still open
+        batch_size: number of rows fetched from the cursor at a time
+
+    Returns:
+        Response: chunked response emitting one JSON document per line
+    """
+    def generate():
+        # The streaming cursor keeps its connection busy until exhausted, so
+        # lookups for related rows go through a second session
+        with db.Session() as stream_session, db.Session() as lookup_session:
+            try:
+                result = stream_session.execute(query.execution_options(yield_per=batch_size))
+                for batch in result.scalars().partitions():
+                    lines = [current_app.json.dumps(item) for item in serialize_batch(lookup_session, batch)]
+                    yield '\n'.join(lines) + '\n'
+            except Exception as e:
+                # Headers are already sent; report the failure as the last line
+                yield current_app.json.dumps({"error": str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -20,6 +20,8 @@ class Person(Base):
     Geburtsdatum = sqlalchemy.Column(sqlalchemy.Date, nullable=False)
     Titel = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
 
+    adresse = relationship('Adresse')
+
 class Unternehmen(Base):
     __tablename__ = 'Unternehmen'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -27,6 +29,8 @@ class Unternehmen(Base):
     Adresse = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Adresse.id'), nullable=False)
     Umsatz = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
 
+    adresse = relationship('Adresse')
+
 class Kontakt(Base):
     __tablename__ = 'Kontakt'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -37,6 +41,9 @@ class Kontakt(Base):
     UnternehmenId = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Unternehmen.id'), nullable=True)
     RefTyp = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
 
+    person = relationship('Person')
+    unternehmen = relationship('Unternehmen')
+
 class Terminart(Base):
     __tablename__ = 'Terminart'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -44,6 +51,12 @@ class Terminart(Base):
 
 class Termine(Base):
     __tablename__ = 'Termine'
+    __table_args__ = (
+        # Supports the Start/Ende overlap filter of GET /api/termine
+        sqlalchemy.Index('ix_Termine_Start_Ende', 'Start', 'Ende'),
+        # External calendar UID, key of the sync upsert (PUT /api/termine/bulk)
+        sqlalchemy.Index('ux_Termine_Uid', 'Uid', unique=True),
+    )
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
     Titel = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
     Ort = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
@@ -52,6 +65,8 @@ class Termine(Base):
     Ende = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
     Uid = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
 
+    art = relationship('Terminart')
+
 class Protokoll(Base):
     __tablename__ = 'Protokoll'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -61,6 +76,8 @@ class Protokoll(Base):
     TLDR = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
     Termin = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Termine.id'), nullable=False)
 
+    termin = relationship('Termine')
+
 class Teilnehmer(Base):
     __tablename__ = 'Teilnehmer'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -68,6 +85,9 @@ class Teilnehmer(Base):
     Termin = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Termine.id'), nullable=False)
     istHaupt = sqlalchemy.Column(sqlalchemy.Boolean, nullable=False)
 
+    kontakt = relationship('Kontakt')
+    termin = relationship('Termine')
+
 class Medium(Base):
     __tablename__ = 'Medium'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -80,6 +100,9 @@ class Anhang(Base):
     Protokoll = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Protokoll.id'), nullable=False)
     Medium = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Medium.id'), nullable=False)
 
+    protokoll = relationship('Protokoll')
+    medium = relationship('Medium')
+
 class Produkt(Base):
     __tablename__ = 'Produkt'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -99,9 +122,17 @@ class Auftrag(Base):
     Kontakt = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Kontakt.id'), nullable=False)
     terminid = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Termine.id'), nullable=True)
 
+    # 'wichtigkeit' is already taken by the foreign key column
+    wichtigkeit_ref = relationship('Wichtigkeit')
+    kontakt = relationship('Kontakt')
+    termin = relationship('Termine')
+    positionen = relationship('Auftragsposition', back_populates='auftrag')
+
 class Auftragsposition(Base):
     __tablename__ = 'Auftragsposition'
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
     Auftrag = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Auftrag.id'), nullable=False)
     Produkt = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('Produkt.id'), nullable=False)
 
+    auftrag = relationship('Auftrag', back_populates='positionen')
+    produkt = relationship('Produkt')
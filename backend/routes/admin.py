@@ -0,0 +1,87 @@
+from flask import Blueprint, Response, current_app, jsonify, request, send_file
+from backend.classes.admin_auth import has_admin_token
+
+
+def init_routes(db):
+    """Initialize the admin routes, available when ADMIN_TOKEN is configured"""
+    admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+    @admin_bp.before_request
+    def require_token():
+        """Accept 'Authorization: Bearer <ADMIN_TOKEN>' only; 404 while no token is configured."""
+        if not current_app.config.get('ADMIN_TOKEN'):
+            return jsonify({"error": "Not found"}), 404
+        if not has_admin_token():
+            return jsonify({"error": "Unauthorized"}), 401
+        return None
+
+    @admin_bp.route('/slow-queries', methods=['GET'])
+    def get_slow_queries():
+        """Get the statement fingerprints with the highest cost (?limit=20&sort=total_ms)"""
+        try:
+            slow_query_log = current_app.extensions['slow_query_log']
+            if not current_app.config['SLOW_QUERY_ENABLED']:
+                return jsonify({"error": "Slow query log is disabled (SLOW_QUERY_ENABLED)"}), 409
+
+            try:
+                limit = int(request.args.get('limit', 20))
+                if limit < 1:
+                    raise ValueError("limit must be positive")
+                queries = slow_query_log.top(limit, request.args.get('sort', 'total_ms'))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            return jsonify({
+                "queries": queries,
+                "count": len(queries),
+                "threshold_ms": current_app.config['SLOW_QUERY_THRESHOLD_MS']
+            }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @admin_bp.route('/slow-queries', methods=['DELETE'])
+    def reset_slow_queries():
+        """Discard the collected statistics"""
+        try:
+            current_app.extensions['slow_query_log'].clear()
+            return jsonify({"message": "Slow query statistics cleared"}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @admin_bp.route('/profiles', methods=['GET'])
+    def get_profiles():
+        """Get the stored request profiles, newest first"""
+        try:
+            if not current_app.config['PROFILER_ENABLED']:
+                return jsonify({"error": "Profiler is disabled (PROFILER_ENABLED)"}), 409
+
+            profiles = current_app.extensions['profiler'].profiles()
+            return jsonify({"profiles": profiles, "count": len(profiles)}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+    def get_profile(profile_id):
+        """Download a profile as pstats file, or as text report with '?format=text&sort=cumulative'"""
+        try:
+            if not current_app.config['PROFILER_ENABLED']:
+                return jsonify({"error": "Profiler is disabled (PROFILER_ENABLED)"}), 409
+
+            profiler = current_app.extensions['profiler']
+            try:
+                path = profiler.path(profile_id)
+            except FileNotFoundError:
+                return jsonify({"error": "Profile not found"}), 404
+
+            if request.args.get('format') == 'text':
+                try:
+                    report = profiler.report(profile_id, request.args.get('sort', 'cumulative'))
+                except KeyError as e:
+                    return jsonify({"error": f"Unknown sort key {e}"}), 400
+                return Response(report, mimetype='text/plain')
+
+            return send_file(path, mimetype='application/octet-stream', as_attachment=True)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    return admin_bp
@@ -1,29 +1,36 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
 
-adresse_bp = Blueprint('adresse', __name__, url_prefix='/api/adresse')
-
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    adresse_bp = Blueprint('adresse', __name__, url_prefix='/api/adresse')
     
     @adresse_bp.route('', methods=['GET'])
     def get_addresses():
         """Get all addresses"""
         try:
-            with db.session as session:
-                addresses = session.execute(select(tables.Adresse)).scalars().all()
-                result = []
-                for address in addresses:
-                    result.append({
-                        "id": address.id,
-                        "plz": address.Plz,
-                        "ortsname": address.ortsname,
-                        "strasse": address.Strasse,
-                        "hausnr": address.Hausnr
-                    })
-                return jsonify({"addresses": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.ADRESSE)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Adresse.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                addresses = page.trim(session.execute(
+                    page.apply(select(tables.Adresse).options(*fields.load_only()))
+                ).scalars().all())
+                result = [fields.serialize(address) for address in addresses]
+                return jsonify({"addresses": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -32,19 +39,18 @@ def init_routes(db):
     def get_address(address_id):
         """Get a single address by ID"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.ADRESSE)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 address = session.execute(
-                    select(tables.Adresse).where(tables.Adresse.id == address_id)
+                    select(tables.Adresse).options(*fields.load_only()).where(tables.Adresse.id == address_id)
                 ).scalar_one_or_none()
                 
                 if address:
-                    return jsonify({
-                        "id": address.id,
-                        "plz": address.Plz,
-                        "ortsname": address.ortsname,
-                        "strasse": address.Strasse,
-                        "hausnr": address.Hausnr
-                    }), 200
+                    return jsonify(fields.serialize(address)), 200
                 else:
                     return jsonify({"error": "Address not found"}), 404
         except Exception as e:
@@ -61,7 +67,7 @@ def init_routes(db):
             if not all(key in data for key in ['plz', 'ortsname', 'strasse', 'hausnr']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_address = tables.Adresse(
                     Plz=data['plz'],
                     ortsname=data['ortsname'],
@@ -83,13 +89,31 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @adresse_bp.route('/bulk', methods=['POST'])
+    def create_addresses_bulk():
+        """Create many addresses in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.ADRESSE, ['plz', 'ortsname', 'strasse', 'hausnr'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Adresse, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @adresse_bp.route('/<int:address_id>', methods=['PUT'])
     def update_address(address_id):
         """Update an existing address"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 address = session.execute(
                     select(tables.Adresse).where(tables.Adresse.id == address_id)
                 ).scalar_one_or_none()
@@ -125,7 +149,7 @@ def init_routes(db):
     def delete_address(address_id):
         """Delete an address"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 address = session.execute(
                     select(tables.Adresse).where(tables.Adresse.id == address_id)
                 ).scalar_one_or_none()
@@ -1,104 +1,84 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
-anhang_bp = Blueprint('anhang', __name__, url_prefix='/api/anhang')
+
+def attachment_to_dict(attachment, reference_cache, fields):
+    """Serialize the selected fields of an attachment with its (eager-loaded) protocol and cached medium"""
+    attachment_data = fields.serialize(attachment)
+    
+    # Resolve Protokoll foreign key
+    protokoll = attachment.protokoll if 'protokoll' in fields else None
+    if protokoll:
+        attachment_data["protokoll"] = fields.nested('protokoll').serialize(protokoll)
+    
+    # Resolve Medium foreign key from the reference cache
+    medium = reference_cache.get(tables.Medium, attachment.Medium) if 'medium' in fields else None
+    if medium:
+        attachment_data["medium"] = fields.nested('medium').serialize(medium)
+    
+    return attachment_data
+
+
+def attachment_query(fields):
+    """select() of the attachments loading only the columns behind the selected fields"""
+    query = select(tables.Anhang).options(*fields.load_only())
+    if 'protokoll' in fields:
+        query = query.options(
+            joinedload(tables.Anhang.protokoll).options(*fields.nested('protokoll').load_only())
+        )
+    return query
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    anhang_bp = Blueprint('anhang', __name__, url_prefix='/api/anhang')
     
     @anhang_bp.route('', methods=['GET'])
     def get_attachments():
-        """Get all attachments with resolved protocol and medium data"""
+        """Get all attachments (protocol and medium data with '?expand=protokoll,medium')"""
         try:
-            with db.session as session:
-                attachments = session.execute(select(tables.Anhang)).scalars().all()
-                result = []
-                for attachment in attachments:
-                    attachment_data = {
-                        "id": attachment.id,
-                        "protokoll_id": attachment.Protokoll,
-                        "medium_id": attachment.Medium
-                    }
-                    
-                    # Resolve Protokoll foreign key
-                    protokoll = session.execute(
-                        select(tables.Protokoll).where(tables.Protokoll.id == attachment.Protokoll)
-                    ).scalar_one_or_none()
-                    
-                    if protokoll:
-                        attachment_data["protokoll"] = {
-                            "id": protokoll.id,
-                            "datum": protokoll.Datum.isoformat() if protokoll.Datum else None,
-                            "text": protokoll.Text,
-                            "dauer": protokoll.Dauer,
-                            "tldr": protokoll.TLDR,
-                            "termin_id": protokoll.Termin
-                        }
-                    
-                    # Resolve Medium foreign key
-                    medium = session.execute(
-                        select(tables.Medium).where(tables.Medium.id == attachment.Medium)
-                    ).scalar_one_or_none()
-                    
-                    if medium:
-                        attachment_data["medium"] = {
-                            "id": medium.id,
-                            "dateityp": medium.Dateityp,
-                            "dateiname": medium.Dateiname
-                        }
-                    
-                    result.append(attachment_data)
-                return jsonify({"attachments": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.ANHANG)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Anhang.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                attachments = page.trim(session.execute(
+                    page.apply(attachment_query(fields))
+                ).scalars().all())
+                result = [attachment_to_dict(attachment, db.reference_cache, fields) for attachment in attachments]
+                return jsonify({"attachments": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @anhang_bp.route('/<int:attachment_id>', methods=['GET'])
     def get_attachment(attachment_id):
-        """Get a single attachment by ID with resolved protocol and medium data"""
+        """Get a single attachment by ID (protocol and medium data with '?expand=protokoll,medium')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.ANHANG)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 attachment = session.execute(
-                    select(tables.Anhang).where(tables.Anhang.id == attachment_id)
+                    attachment_query(fields).where(tables.Anhang.id == attachment_id)
                 ).scalar_one_or_none()
                 
                 if attachment:
-                    attachment_data = {
-                        "id": attachment.id,
-                        "protokoll_id": attachment.Protokoll,
-                        "medium_id": attachment.Medium
-                    }
-                    
-                    # Resolve Protokoll foreign key
-                    protokoll = session.execute(
-                        select(tables.Protokoll).where(tables.Protokoll.id == attachment.Protokoll)
-                    ).scalar_one_or_none()
-                    
-                    if protokoll:
-                        attachment_data["protokoll"] = {
-                            "id": protokoll.id,
-                            "datum": protokoll.Datum.isoformat() if protokoll.Datum else None,
-                            "text": protokoll.Text,
-                            "dauer": protokoll.Dauer,
-                            "tldr": protokoll.TLDR,
-                            "termin_id": protokoll.Termin
-                        }
-                    
-                    # Resolve Medium foreign key
-                    medium = session.execute(
-                        select(tables.Medium).where(tables.Medium.id == attachment.Medium)
-                    ).scalar_one_or_none()
-                    
-                    if medium:
-                        attachment_data["medium"] = {
-                            "id": medium.id,
-                            "dateityp": medium.Dateityp,
-                            "dateiname": medium.Dateiname
-                        }
-                    
-                    return jsonify(attachment_data), 200
+                    return jsonify(attachment_to_dict(attachment, db.reference_cache, fields)), 200
                 else:
                     return jsonify({"error": "Attachment not found"}), 404
         except Exception as e:
@@ -115,7 +95,7 @@ def init_routes(db):
             if not all(key in data for key in ['protokoll_id', 'medium_id']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_attachment = tables.Anhang(
                     Protokoll=data['protokoll_id'],
                     Medium=data['medium_id']
@@ -133,13 +113,31 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @anhang_bp.route('/bulk', methods=['POST'])
+    def create_attachments_bulk():
+        """Create many attachments in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.ANHANG, ['protokoll_id', 'medium_id'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Anhang, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @anhang_bp.route('/<int:attachment_id>', methods=['PUT'])
     def update_attachment(attachment_id):
         """Update an existing attachment"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 attachment = session.execute(
                     select(tables.Anhang).where(tables.Anhang.id == attachment_id)
                 ).scalar_one_or_none()
@@ -169,7 +167,7 @@ def init_routes(db):
     def delete_attachment(attachment_id):
         """Delete an attachment"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 attachment = session.execute(
                     select(tables.Anhang).where(tables.Anhang.id == attachment_id)
                 ).scalar_one_or_none()
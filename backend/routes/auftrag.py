@@ -1,108 +1,112 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
-from sqlalchemy import select
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload
+from decimal import Decimal
 
-auftrag_bp = Blueprint('auftrag', __name__, url_prefix='/api/auftrag')
+
+def order_to_dict(row, reference_cache, fields):
+    """Serialize the selected fields of an order row from order_query() with its cached importance, (eager-loaded) contact and totals"""
+    order = row[0]
+    order_data = fields.serialize(order)
+    
+    # Resolve Wichtigkeit foreign key from the reference cache
+    wichtigkeit = reference_cache.get(tables.Wichtigkeit, order.wichtigkeit) if 'wichtigkeit' in fields else None
+    if wichtigkeit:
+        order_data["wichtigkeit"] = fields.nested('wichtigkeit').serialize(wichtigkeit)
+    
+    # Resolve Kontakt foreign key
+    kontakt = order.kontakt if 'kontakt' in fields else None
+    if kontakt:
+        order_data["kontakt"] = fields.nested('kontakt').serialize(kontakt)
+    
+    if 'totals' in fields:
+        order_data["position_count"] = row.position_count
+        order_data["total"] = row.total
+    
+    return order_data
+
+
+def order_query(fields):
+    """select() of the orders loading only the columns behind the selected fields, plus their totals when expanded"""
+    if 'totals' in fields:
+        # Correlated subqueries: only the items of the returned orders are
+        # aggregated (through the index on Auftragsposition.Auftrag), not the
+        # whole table, so a single order or a page stays cheap
+        belongs_to_order = tables.Auftragsposition.Auftrag == tables.Auftrag.id
+        position_count = (
+            select(func.count(tables.Auftragsposition.id))
+            .where(belongs_to_order)
+            .scalar_subquery()
+        )
+        total = (
+            # Stays a DECIMAL sum; coalesced with a Decimal so the type is kept
+            select(func.coalesce(func.sum(tables.Produkt.Preis), Decimal(0)))
+            .select_from(tables.Auftragsposition)
+            .join(tables.Produkt, tables.Produkt.id == tables.Auftragsposition.Produkt)
+            .where(belongs_to_order)
+            .scalar_subquery()
+        )
+        query = select(tables.Auftrag, position_count.label('position_count'), total.label('total'))
+    else:
+        query = select(tables.Auftrag)
+    
+    query = query.options(*fields.load_only())
+    if 'kontakt' in fields:
+        query = query.options(
+            joinedload(tables.Auftrag.kontakt).options(*fields.nested('kontakt').load_only())
+        )
+    return query
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    auftrag_bp = Blueprint('auftrag', __name__, url_prefix='/api/auftrag')
     
     @auftrag_bp.route('', methods=['GET'])
     def get_orders():
-        """Get all orders with resolved contact and importance data"""
+        """Get all orders (contact and importance data, item count and total with '?expand=kontakt,wichtigkeit,totals')"""
         try:
-            with db.session as session:
-                orders = session.execute(select(tables.Auftrag)).scalars().all()
-                result = []
-                for order in orders:
-                    order_data = {
-                        "id": order.id,
-                        "bezeichnung": order.Bezeichnung,
-                        "wichtigkeit_id": order.wichtigkeit,
-                        "kontakt_id": order.Kontakt,
-                        "termin_id": order.terminid
-                    }
-                    
-                    # Resolve Wichtigkeit foreign key
-                    wichtigkeit = session.execute(
-                        select(tables.Wichtigkeit).where(tables.Wichtigkeit.id == order.wichtigkeit)
-                    ).scalar_one_or_none()
-                    
-                    if wichtigkeit:
-                        order_data["wichtigkeit"] = {
-                            "id": wichtigkeit.id,
-                            "level": wichtigkeit.level
-                        }
-                    
-                    # Resolve Kontakt foreign key
-                    kontakt = session.execute(
-                        select(tables.Kontakt).where(tables.Kontakt.id == order.Kontakt)
-                    ).scalar_one_or_none()
-                    
-                    if kontakt:
-                        order_data["kontakt"] = {
-                            "id": kontakt.id,
-                            "email": kontakt.EMail,
-                            "telefonnummer": kontakt.Telefonnummer,
-                            "rolle": kontakt.Rolle,
-                            "person_id": kontakt.PersonId,
-                            "unternehmen_id": kontakt.UnternehmenId,
-                            "ref_typ": kontakt.RefTyp
-                        }
-                    
-                    result.append(order_data)
-                return jsonify({"orders": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.AUFTRAG)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Auftrag.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                rows = page.trim(session.execute(
+                    page.apply(order_query(fields))
+                ).all(), entity=lambda row: row[0])
+                result = [order_to_dict(row, db.reference_cache, fields) for row in rows]
+                return jsonify({"orders": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @auftrag_bp.route('/<int:order_id>', methods=['GET'])
     def get_order(order_id):
-        """Get a single order by ID with resolved contact and importance data"""
+        """Get a single order by ID (contact and importance data, item count and total with '?expand=kontakt,wichtigkeit,totals')"""
         try:
-            with db.session as session:
-                order = session.execute(
-                    select(tables.Auftrag).where(tables.Auftrag.id == order_id)
-                ).scalar_one_or_none()
+            try:
+                fields = FieldSelection.from_request(request.args, schema.AUFTRAG)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                row = session.execute(
+                    order_query(fields).where(tables.Auftrag.id == order_id)
+                ).one_or_none()
                 
-                if order:
-                    order_data = {
-                        "id": order.id,
-                        "bezeichnung": order.Bezeichnung,
-                        "wichtigkeit_id": order.wichtigkeit,
-                        "kontakt_id": order.Kontakt,
-                        "termin_id": order.terminid
-                    }
-                    
-                    # Resolve Wichtigkeit foreign key
-                    wichtigkeit = session.execute(
-                        select(tables.Wichtigkeit).where(tables.Wichtigkeit.id == order.wichtigkeit)
-                    ).scalar_one_or_none()
-                    
-                    if wichtigkeit:
-                        order_data["wichtigkeit"] = {
-                            "id": wichtigkeit.id,
-                            "level": wichtigkeit.level
-                        }
-                    
-                    # Resolve Kontakt foreign key
-                    kontakt = session.execute(
-                        select(tables.Kontakt).where(tables.Kontakt.id == order.Kontakt)
-                    ).scalar_one_or_none()
-                    
-                    if kontakt:
-                        order_data["kontakt"] = {
-                            "id": kontakt.id,
-                            "email": kontakt.EMail,
-                            "telefonnummer": kontakt.Telefonnummer,
-                            "rolle": kontakt.Rolle,
-                            "person_id": kontakt.PersonId,
-                            "unternehmen_id": kontakt.UnternehmenId,
-                            "ref_typ": kontakt.RefTyp
-                        }
-                    
-                    return jsonify(order_data), 200
+                if row:
+                    return jsonify(order_to_dict(row, db.reference_cache, fields)), 200
                 else:
                     return jsonify({"error": "Order not found"}), 404
         except Exception as e:
@@ -111,49 +115,92 @@ def init_routes(db):
 
     @auftrag_bp.route('', methods=['POST'])
     def create_order():
-        """Create a new order"""
+        """
+        Create a new order.
+
+        An optional 'positionen' list of product ids creates the order items
+        in the same transaction, so either the complete order is stored or
+        nothing.
+        """
         try:
             data = request.get_json()
             
             # Validate required fields
-<<<<<<< HEAD
             if not all(key in data for key in ['bezeichnung', 'wichtigkeit_id', 'kontakt_id']):
-                print(data)
-=======
-            if not all(key in data for key in ['bezeichnung', 'wichtigkeit_id', 'kontakt_id', 'termin_id']):
->>>>>>> a4b790c45c63c7de203393ce6a0a69a967210a6a
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            positionen = data.get('positionen', [])
+            if not isinstance(positionen, list) or not all(isinstance(p, int) and not isinstance(p, bool) for p in positionen):
+                return jsonify({"error": "'positionen' must be a list of product ids"}), 400
+            
+            with db.Session() as session:
+                if positionen:
+                    existing = set(session.execute(
+                        select(tables.Produkt.id).where(tables.Produkt.id.in_(set(positionen)))
+                    ).scalars())
+                    missing = sorted(set(positionen) - existing)
+                    if missing:
+                        return jsonify({"error": f"Unknown product ids: {missing}"}), 400
+                
                 new_order = tables.Auftrag(
                     Bezeichnung=data['bezeichnung'],
                     wichtigkeit=data['wichtigkeit_id'],
                     Kontakt=data['kontakt_id'],
-                    terminid=data['termin_id']
+                    terminid=data.get('termin_id')
                 )
                 session.add(new_order)
-                session.commit()
-                session.refresh(new_order)
+                # Assigns the order id without committing
+                session.flush()
                 
-                return jsonify({
+                position_ids = insert_rows(session, tables.Auftragsposition, [
+                    {"Auftrag": new_order.id, "Produkt": produkt_id} for produkt_id in positionen
+                ]) if positionen else []
+                
+                # Assembled before the commit, which would expire the attributes
+                order_data = {
                     "id": new_order.id,
                     "bezeichnung": new_order.Bezeichnung,
                     "wichtigkeit_id": new_order.wichtigkeit,
                     "kontakt_id": new_order.Kontakt,
-                    "termin_id": new_order.terminid
-                }), 201
+                    "termin_id": new_order.terminid,
+                    "positionen": [
+                        {"id": position_id, "auftrag_id": new_order.id, "produkt_id": produkt_id}
+                        for position_id, produkt_id in zip(position_ids, positionen)
+                    ]
+                }
+                session.commit()
+                
+                return jsonify(order_data), 201
         except Exception as e:
             print(e)
             return jsonify({"error": str(e)}), 500
 
 
+    @auftrag_bp.route('/bulk', methods=['POST'])
+    def create_orders_bulk():
+        """Create many orders in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.AUFTRAG, ['bezeichnung', 'wichtigkeit_id', 'kontakt_id'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Auftrag, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @auftrag_bp.route('/<int:order_id>', methods=['PUT'])
     def update_order(order_id):
         """Update an existing order"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 order = session.execute(
                     select(tables.Auftrag).where(tables.Auftrag.id == order_id)
                 ).scalar_one_or_none()
@@ -189,7 +236,7 @@ def init_routes(db):
     def delete_order(order_id):
         """Delete an order"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 order = session.execute(
                     select(tables.Auftrag).where(tables.Auftrag.id == order_id)
                 ).scalar_one_or_none()
@@ -1,102 +1,88 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
-auftragsposition_bp = Blueprint('auftragsposition', __name__, url_prefix='/api/auftragsposition')
+
+def order_item_to_dict(item, fields):
+    """Serialize the selected fields of an order item with its (eager-loaded) order and product"""
+    item_data = fields.serialize(item)
+    
+    # Resolve Auftrag foreign key
+    auftrag = item.auftrag if 'auftrag' in fields else None
+    if auftrag:
+        item_data["auftrag"] = fields.nested('auftrag').serialize(auftrag)
+    
+    # Resolve Produkt foreign key
+    produkt = item.produkt if 'produkt' in fields else None
+    if produkt:
+        item_data["produkt"] = fields.nested('produkt').serialize(produkt)
+    
+    return item_data
+
+
+def order_item_query(fields):
+    """select() of the order items loading only the columns behind the selected fields"""
+    query = select(tables.Auftragsposition).options(*fields.load_only())
+    if 'auftrag' in fields:
+        query = query.options(
+            joinedload(tables.Auftragsposition.auftrag).options(*fields.nested('auftrag').load_only())
+        )
+    if 'produkt' in fields:
+        query = query.options(
+            joinedload(tables.Auftragsposition.produkt).options(*fields.nested('produkt').load_only())
+        )
+    return query
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    auftragsposition_bp = Blueprint('auftragsposition', __name__, url_prefix='/api/auftragsposition')
     
     @auftragsposition_bp.route('', methods=['GET'])
     def get_order_items():
-        """Get all order items with resolved order and product data"""
+        """Get all order items (order and product data with '?expand=auftrag,produkt')"""
         try:
-            with db.session as session:
-                items = session.execute(select(tables.Auftragsposition)).scalars().all()
-                result = []
-                for item in items:
-                    item_data = {
-                        "id": item.id,
-                        "auftrag_id": item.Auftrag,
-                        "produkt_id": item.Produkt
-                    }
-                    
-                    # Resolve Auftrag foreign key
-                    auftrag = session.execute(
-                        select(tables.Auftrag).where(tables.Auftrag.id == item.Auftrag)
-                    ).scalar_one_or_none()
-                    
-                    if auftrag:
-                        item_data["auftrag"] = {
-                            "id": auftrag.id,
-                            "bezeichnung": auftrag.Bezeichnung,
-                            "wichtigkeit_id": auftrag.wichtigkeit,
-                            "kontakt_id": auftrag.Kontakt,
-                            "termin_id": auftrag.terminid
-                        }
-                    
-                    # Resolve Produkt foreign key
-                    produkt = session.execute(
-                        select(tables.Produkt).where(tables.Produkt.id == item.Produkt)
-                    ).scalar_one_or_none()
-                    
-                    if produkt:
-                        item_data["produkt"] = {
-                            "id": produkt.id,
-                            "name": produkt.Bezeichnung,
-                            "price": float(produkt.Preis) if produkt.Preis else None
-                        }
-                    
-                    result.append(item_data)
-                return jsonify({"order_items": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.AUFTRAGSPOSITION)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Auftragsposition.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                items = page.trim(session.execute(
+                    page.apply(order_item_query(fields))
+                ).scalars().all())
+                result = [order_item_to_dict(item, fields) for item in items]
+                return jsonify({"order_items": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @auftragsposition_bp.route('/<int:item_id>', methods=['GET'])
     def get_order_item(item_id):
-        """Get a single order item by ID with resolved order and product data"""
+        """Get a single order item by ID (order and product data with '?expand=auftrag,produkt')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.AUFTRAGSPOSITION)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 item = session.execute(
-                    select(tables.Auftragsposition).where(tables.Auftragsposition.id == item_id)
+                    order_item_query(fields).where(tables.Auftragsposition.id == item_id)
                 ).scalar_one_or_none()
                 
                 if item:
-                    item_data = {
-                        "id": item.id,
-                        "auftrag_id": item.Auftrag,
-                        "produkt_id": item.Produkt
-                    }
-                    
-                    # Resolve Auftrag foreign key
-                    auftrag = session.execute(
-                        select(tables.Auftrag).where(tables.Auftrag.id == item.Auftrag)
-                    ).scalar_one_or_none()
-                    
-                    if auftrag:
-                        item_data["auftrag"] = {
-                            "id": auftrag.id,
-                            "bezeichnung": auftrag.Bezeichnung,
-                            "wichtigkeit_id": auftrag.wichtigkeit,
-                            "kontakt_id": auftrag.Kontakt,
-                            "termin_id": auftrag.terminid
-                        }
-                    
-                    # Resolve Produkt foreign key
-                    produkt = session.execute(
-                        select(tables.Produkt).where(tables.Produkt.id == item.Produkt)
-                    ).scalar_one_or_none()
-                    
-                    if produkt:
-                        item_data["produkt"] = {
-                            "id": produkt.id,
-                            "name": produkt.Bezeichnung,
-                            "price": float(produkt.Preis) if produkt.Preis else None
-                        }
-                    
-                    return jsonify(item_data), 200
+                    return jsonify(order_item_to_dict(item, fields)), 200
                 else:
                     return jsonify({"error": "Order item not found"}), 404
         except Exception as e:
@@ -113,7 +99,7 @@ def init_routes(db):
             if not all(key in data for key in ['auftrag_id', 'produkt_id']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_item = tables.Auftragsposition(
                     Auftrag=data['auftrag_id'],
                     Produkt=data['produkt_id']
@@ -131,13 +117,31 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @auftragsposition_bp.route('/bulk', methods=['POST'])
+    def create_order_items_bulk():
+        """Create many order items in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.AUFTRAGSPOSITION, ['auftrag_id', 'produkt_id'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Auftragsposition, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @auftragsposition_bp.route('/<int:item_id>', methods=['PUT'])
     def update_order_item(item_id):
         """Update an existing order item"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 item = session.execute(
                     select(tables.Auftragsposition).where(tables.Auftragsposition.id == item_id)
                 ).scalar_one_or_none()
@@ -167,7 +171,7 @@ def init_routes(db):
     def delete_order_item(item_id):
         """Delete an order item"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 item = session.execute(
                     select(tables.Auftragsposition).where(tables.Auftragsposition.id == item_id)
                 ).scalar_one_or_none()
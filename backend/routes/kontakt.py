@@ -1,170 +1,153 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
+from backend.classes.streaming import wants_stream, ndjson_response
 from sqlalchemy import select
 
-kontakt_bp = Blueprint('kontakt', __name__, url_prefix='/api/kontakt')
+
+def resolve_references(session, contacts):
+    """
+    Resolve the Person/Unternehmen reference of each contact in batches.
+
+    Collects all referenced ids, loads each target table once with IN (...)
+    and all of their addresses with one more query, so the number of queries
+    does not depend on the number of contacts.
+
+    Returns:
+        dict: contact id -> referenz_data dict (only for resolvable references)
+    """
+    person_ids = {c.PersonId for c in contacts if c.RefTyp == "Person" and c.PersonId is not None}
+    unternehmen_ids = {c.UnternehmenId for c in contacts if c.RefTyp == "Unternehmen" and c.UnternehmenId is not None}
+
+    persons = {}
+    if person_ids:
+        persons = {p.id: p for p in session.execute(
+            select(tables.Person).where(tables.Person.id.in_(person_ids))
+        ).scalars()}
+
+    companies = {}
+    if unternehmen_ids:
+        companies = {u.id: u for u in session.execute(
+            select(tables.Unternehmen).where(tables.Unternehmen.id.in_(unternehmen_ids))
+        ).scalars()}
+
+    adresse_ids = {p.Adresse for p in persons.values()} | {u.Adresse for u in companies.values()}
+    addresses = {}
+    if adresse_ids:
+        addresses = {a.id: a for a in session.execute(
+            select(tables.Adresse).where(tables.Adresse.id.in_(adresse_ids))
+        ).scalars()}
+
+    references = {}
+    for contact in contacts:
+        if contact.RefTyp == "Person" and contact.PersonId in persons:
+            person = persons[contact.PersonId]
+            referenz_data = {
+                "id": person.id,
+                "name": person.Name,
+                "adresse_id": person.Adresse,
+                "geburtsdatum": person.Geburtsdatum,
+                "titel": person.Titel
+            }
+        elif contact.RefTyp == "Unternehmen" and contact.UnternehmenId in companies:
+            unternehmen = companies[contact.UnternehmenId]
+            referenz_data = {
+                "id": unternehmen.id,
+                "name": unternehmen.Name,
+                "adresse_id": unternehmen.Adresse,
+                "umsatz": unternehmen.Umsatz
+            }
+        else:
+            continue
+
+        adresse = addresses.get(referenz_data["adresse_id"])
+        if adresse:
+            referenz_data["adresse"] = {
+                "id": adresse.id,
+                "plz": adresse.Plz,
+                "ortsname": adresse.ortsname,
+                "strasse": adresse.Strasse,
+                "hausnr": adresse.Hausnr
+            }
+        references[contact.id] = referenz_data
+    return references
+
+
+def contacts_to_dicts(session, contacts, fields):
+    """Serialize the selected fields of a batch of contacts, resolving their references with resolve_references()"""
+    references = resolve_references(session, contacts) if 'referenz_data' in fields else {}
+    result = []
+    for contact in contacts:
+        contact_data = fields.serialize(contact)
+        
+        if contact.id in references:
+            contact_data["referenz_data"] = references[contact.id]
+        
+        result.append(contact_data)
+    return result
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    kontakt_bp = Blueprint('kontakt', __name__, url_prefix='/api/kontakt')
     
     @kontakt_bp.route('', methods=['GET'])
     def get_contacts():
-        """Get all contacts with resolved Person or Unternehmen data"""
+        """
+        Get all contacts (Person or Unternehmen data with '?expand=referenz_data').
+
+        With '?stream=1' or 'Accept: application/x-ndjson' the complete table is
+        streamed as NDJSON instead (pagination parameters are ignored).
+        """
         try:
-            with db.session as session:
-                contacts = session.execute(select(tables.Kontakt)).scalars().all()
-                result = []
-                for contact in contacts:
-                    contact_data = {
-                        "id": contact.id,
-                        "email": contact.EMail,
-                        "telefonnummer": contact.Telefonnummer,
-                        "rolle": contact.Rolle,
-                        "person_id": contact.PersonId,
-                        "unternehmen_id": contact.UnternehmenId,
-                        "ref_typ": contact.RefTyp
-                    }
-                    
-                    # Resolve Referenz foreign key (Person or Unternehmen)
-                    if contact.RefTyp == "Person":
-                        person = session.execute(
-                            select(tables.Person).where(tables.Person.id == contact.PersonId)
-                        ).scalar_one_or_none()
-                        
-                        if person:
-                            # Also resolve Adresse for Person
-                            adresse = session.execute(
-                                select(tables.Adresse).where(tables.Adresse.id == person.Adresse)
-                            ).scalar_one_or_none()
-                            
-                            contact_data["referenz_data"] = {
-                                "id": person.id,
-                                "name": person.Name,
-                                "adresse_id": person.Adresse,
-                                "geburtsdatum": person.Geburtsdatum.isoformat() if person.Geburtsdatum else None,
-                                "titel": person.Titel
-                            }
-                            
-                            if adresse:
-                                contact_data["referenz_data"]["adresse"] = {
-                                    "id": adresse.id,
-                                    "plz": adresse.Plz,
-                                    "ortsname": adresse.ortsname,
-                                    "strasse": adresse.Strasse,
-                                    "hausnr": adresse.Hausnr
-                                }
-                    
-                    elif contact.RefTyp == "Unternehmen":
-                        unternehmen = session.execute(
-                            select(tables.Unternehmen).where(tables.Unternehmen.id == contact.UnternehmenId)
-                        ).scalar_one_or_none()
-                        
-                        if unternehmen:
-                            # Also resolve Adresse for Unternehmen
-                            adresse = session.execute(
-                                select(tables.Adresse).where(tables.Adresse.id == unternehmen.Adresse)
-                            ).scalar_one_or_none()
-                            
-                            contact_data["referenz_data"] = {
-                                "id": unternehmen.id,
-                                "name": unternehmen.Name,
-                                "adresse_id": unternehmen.Adresse,
-                                "umsatz": unternehmen.Umsatz
-                            }
-                            
-                            if adresse:
-                                contact_data["referenz_data"]["adresse"] = {
-                                    "id": adresse.id,
-                                    "plz": adresse.Plz,
-                                    "ortsname": adresse.ortsname,
-                                    "strasse": adresse.Strasse,
-                                    "hausnr": adresse.Hausnr
-                                }
-                    
-                    result.append(contact_data)
-                return jsonify({"contacts": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.KONTAKT)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            query = select(tables.Kontakt).options(*fields.load_only())
+
+            if wants_stream(request):
+                return ndjson_response(
+                    db,
+                    query.order_by(tables.Kontakt.id),
+                    lambda session, contacts: contacts_to_dicts(session, contacts, fields)
+                )
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Kontakt.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                contacts = page.trim(session.execute(
+                    page.apply(query)
+                ).scalars().all())
+                result = contacts_to_dicts(session, contacts, fields)
+                return jsonify({"contacts": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @kontakt_bp.route('/<int:contact_id>', methods=['GET'])
     def get_contact(contact_id):
-        """Get a single contact by ID with resolved Person or Unternehmen data"""
+        """Get a single contact by ID (Person or Unternehmen data with '?expand=referenz_data')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.KONTAKT)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 contact = session.execute(
-                    select(tables.Kontakt).where(tables.Kontakt.id == contact_id)
+                    select(tables.Kontakt).options(*fields.load_only()).where(tables.Kontakt.id == contact_id)
                 ).scalar_one_or_none()
                 
                 if contact:
-                    contact_data = {
-                        "id": contact.id,
-                        "email": contact.EMail,
-                        "telefonnummer": contact.Telefonnummer,
-                        "rolle": contact.Rolle,
-                        "person_id": contact.PersonId,
-                        "unternehmen_id": contact.UnternehmenId,
-                        "ref_typ": contact.RefTyp
-                    }
-                    
-                    # Resolve Referenz foreign key (Person or Unternehmen)
-                    if contact.RefTyp == "Person":
-                        person = session.execute(
-                            select(tables.Person).where(tables.Person.id == contact.PersonId)
-                        ).scalar_one_or_none()
-                        
-                        if person:
-                            # Also resolve Adresse for Person
-                            adresse = session.execute(
-                                select(tables.Adresse).where(tables.Adresse.id == person.Adresse)
-                            ).scalar_one_or_none()
-                            
-                            contact_data["referenz_data"] = {
-                                "id": person.id,
-                                "name": person.Name,
-                                "adresse_id": person.Adresse,
-                                "geburtsdatum": person.Geburtsdatum.isoformat() if person.Geburtsdatum else None,
-                                "titel": person.Titel
-                            }
-                            
-                            if adresse:
-                                contact_data["referenz_data"]["adresse"] = {
-                                    "id": adresse.id,
-                                    "plz": adresse.Plz,
-                                    "ortsname": adresse.ortsname,
-                                    "strasse": adresse.Strasse,
-                                    "hausnr": adresse.Hausnr
-                                }
-                    
-                    elif contact.RefTyp == "Unternehmen":
-                        unternehmen = session.execute(
-                            select(tables.Unternehmen).where(tables.Unternehmen.id == contact.UnternehmenId)
-                        ).scalar_one_or_none()
-                        
-                        if unternehmen:
-                            # Also resolve Adresse for Unternehmen
-                            adresse = session.execute(
-                                select(tables.Adresse).where(tables.Adresse.id == unternehmen.Adresse)
-                            ).scalar_one_or_none()
-                            
-                            contact_data["referenz_data"] = {
-                                "id": unternehmen.id,
-                                "name": unternehmen.Name,
-                                "adresse_id": unternehmen.Adresse,
-                                "umsatz": unternehmen.Umsatz
-                            }
-                            
-                            if adresse:
-                                contact_data["referenz_data"]["adresse"] = {
-                                    "id": adresse.id,
-                                    "plz": adresse.Plz,
-                                    "ortsname": adresse.ortsname,
-                                    "strasse": adresse.Strasse,
-                                    "hausnr": adresse.Hausnr
-                                }
-                    
-                    return jsonify(contact_data), 200
+                    return jsonify(contacts_to_dicts(session, [contact], fields)[0]), 200
                 else:
                     return jsonify({"error": "Contact not found"}), 404
         except Exception as e:
@@ -181,7 +164,7 @@ def init_routes(db):
             if not all(key in data for key in ['email', 'telefonnummer', 'rolle', 'person_id', 'unternehmen_id', 'ref_typ']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_contact = tables.Kontakt(
                     EMail=data['email'],
                     Telefonnummer=data['telefonnummer'],
@@ -209,13 +192,31 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @kontakt_bp.route('/bulk', methods=['POST'])
+    def create_contacts_bulk():
+        """Create many contacts in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.KONTAKT, ['email', 'telefonnummer', 'rolle', 'person_id', 'unternehmen_id', 'ref_typ'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Kontakt, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @kontakt_bp.route('/<int:contact_id>', methods=['PUT'])
     def update_contact(contact_id):
         """Update an existing contact"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 contact = session.execute(
                     select(tables.Kontakt).where(tables.Kontakt.id == contact_id)
                 ).scalar_one_or_none()
@@ -257,7 +258,7 @@ def init_routes(db):
     def delete_contact(contact_id):
         """Delete a contact"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 contact = session.execute(
                     select(tables.Kontakt).where(tables.Kontakt.id == contact_id)
                 ).scalar_one_or_none()
@@ -1,27 +1,36 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
 
-medium_bp = Blueprint('medium', __name__, url_prefix='/api/medium')
-
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    medium_bp = Blueprint('medium', __name__, url_prefix='/api/medium')
     
     @medium_bp.route('', methods=['GET'])
     def get_media():
         """Get all media"""
         try:
-            with db.session as session:
-                media = session.execute(select(tables.Medium)).scalars().all()
-                result = []
-                for medium in media:
-                    result.append({
-                        "id": medium.id,
-                        "dateityp": medium.Dateityp,
-                        "dateiname": medium.Dateiname
-                    })
-                return jsonify({"media": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.MEDIUM)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Medium.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                media = page.trim(session.execute(
+                    page.apply(select(tables.Medium).options(*fields.load_only()))
+                ).scalars().all())
+                result = [fields.serialize(medium) for medium in media]
+                return jsonify({"media": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -30,17 +39,18 @@ def init_routes(db):
     def get_medium(medium_id):
         """Get a single medium by ID"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.MEDIUM)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 medium = session.execute(
-                    select(tables.Medium).where(tables.Medium.id == medium_id)
+                    select(tables.Medium).options(*fields.load_only()).where(tables.Medium.id == medium_id)
                 ).scalar_one_or_none()
                 
                 if medium:
-                    return jsonify({
-                        "id": medium.id,
-                        "dateityp": medium.Dateityp,
-                        "dateiname": medium.Dateiname
-                    }), 200
+                    return jsonify(fields.serialize(medium)), 200
                 else:
                     return jsonify({"error": "Medium not found"}), 404
         except Exception as e:
@@ -57,13 +67,14 @@ def init_routes(db):
             if not all(key in data for key in ['dateityp', 'dateiname']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_medium = tables.Medium(
                     Dateityp=data['dateityp'],
                     Dateiname=data['dateiname']
                 )
                 session.add(new_medium)
                 session.commit()
+                db.reference_cache.invalidate(tables.Medium)
                 session.refresh(new_medium)
                 
                 return jsonify({
@@ -75,13 +86,32 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @medium_bp.route('/bulk', methods=['POST'])
+    def create_media_bulk():
+        """Create many media in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.MEDIUM, ['dateityp', 'dateiname'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Medium, rows)
+                session.commit()
+                db.reference_cache.invalidate(tables.Medium)
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @medium_bp.route('/<int:medium_id>', methods=['PUT'])
     def update_medium(medium_id):
         """Update an existing medium"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 medium = session.execute(
                     select(tables.Medium).where(tables.Medium.id == medium_id)
                 ).scalar_one_or_none()
@@ -96,6 +126,7 @@ def init_routes(db):
                     medium.Dateiname = data['dateiname']
                 
                 session.commit()
+                db.reference_cache.invalidate(tables.Medium)
                 session.refresh(medium)
                 
                 return jsonify({
@@ -111,7 +142,7 @@ def init_routes(db):
     def delete_medium(medium_id):
         """Delete a medium"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 medium = session.execute(
                     select(tables.Medium).where(tables.Medium.id == medium_id)
                 ).scalar_one_or_none()
@@ -121,6 +152,7 @@ def init_routes(db):
                 
                 session.delete(medium)
                 session.commit()
+                db.reference_cache.invalidate(tables.Medium)
                 
                 return jsonify({"message": "Medium deleted successfully"}), 200
         except Exception as e:
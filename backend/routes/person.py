@@ -1,81 +1,82 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 
-person_bp = Blueprint('person', __name__, url_prefix='/api/person')
+
+def person_query(fields):
+    """select() of the persons loading only the columns behind the selected fields"""
+    query = select(tables.Person).options(*fields.load_only())
+    if 'adresse' in fields:
+        query = query.options(
+            joinedload(tables.Person.adresse).options(*fields.nested('adresse').load_only())
+        )
+    return query
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    person_bp = Blueprint('person', __name__, url_prefix='/api/person')
     
     @person_bp.route('', methods=['GET'])
     def get_persons():
-        """Get all persons with resolved address data"""
+        """Get all persons (address data with '?expand=adresse')"""
         try:
-            with db.session as session:
-                persons = session.execute(select(tables.Person)).scalars().all()
+            try:
+                fields = FieldSelection.from_request(request.args, schema.PERSON)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Person.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                persons = page.trim(session.execute(
+                    page.apply(person_query(fields))
+                ).scalars().all())
                 result = []
                 for person in persons:
-                    # Resolve Adresse foreign key
-                    adresse = session.execute(
-                        select(tables.Adresse).where(tables.Adresse.id == person.Adresse)
-                    ).scalar_one_or_none()
-                    
-                    person_data = {
-                        "id": person.id,
-                        "name": person.Name,
-                        "adresse_id": person.Adresse,
-                        "geburtsdatum": person.Geburtsdatum.isoformat() if person.Geburtsdatum else None,
-                        "titel": person.Titel
-                    }
+                    person_data = fields.serialize(person)
                     
+                    # Resolve Adresse foreign key
+                    adresse = person.adresse if 'adresse' in fields else None
                     if adresse:
-                        person_data["adresse"] = {
-                            "id": adresse.id,
-                            "plz": adresse.Plz,
-                            "ortsname": adresse.ortsname,
-                            "strasse": adresse.Strasse,
-                            "hausnr": adresse.Hausnr
-                        }
+                        person_data["adresse"] = fields.nested('adresse').serialize(adresse)
                     
                     result.append(person_data)
-                return jsonify({"persons": result, "count": len(result)}), 200
+                return jsonify({"persons": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @person_bp.route('/<int:person_id>', methods=['GET'])
     def get_person(person_id):
-        """Get a single person by ID with resolved address data"""
+        """Get a single person by ID (address data with '?expand=adresse')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.PERSON)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 person = session.execute(
-                    select(tables.Person).where(tables.Person.id == person_id)
+                    person_query(fields).where(tables.Person.id == person_id)
                 ).scalar_one_or_none()
                 
                 if person:
-                    # Resolve Adresse foreign key
-                    adresse = session.execute(
-                        select(tables.Adresse).where(tables.Adresse.id == person.Adresse)
-                    ).scalar_one_or_none()
-                    
-                    person_data = {
-                        "id": person.id,
-                        "name": person.Name,
-                        "adresse_id": person.Adresse,
-                        "geburtsdatum": person.Geburtsdatum.isoformat() if person.Geburtsdatum else None,
-                        "titel": person.Titel
-                    }
+                    person_data = fields.serialize(person)
                     
+                    # Resolve Adresse foreign key
+                    adresse = person.adresse if 'adresse' in fields else None
                     if adresse:
-                        person_data["adresse"] = {
-                            "id": adresse.id,
-                            "plz": adresse.Plz,
-                            "ortsname": adresse.ortsname,
-                            "strasse": adresse.Strasse,
-                            "hausnr": adresse.Hausnr
-                        }
+                        person_data["adresse"] = fields.nested('adresse').serialize(adresse)
                     
                     return jsonify(person_data), 200
                 else:
@@ -94,7 +95,7 @@ def init_routes(db):
             if not all(key in data for key in ['name', 'adresse_id', 'geburtsdatum', 'titel']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 # Parse date
                 geburtsdatum = datetime.fromisoformat(data['geburtsdatum']).date()
                 
@@ -112,20 +113,38 @@ def init_routes(db):
                     "id": new_person.id,
                     "name": new_person.Name,
                     "adresse_id": new_person.Adresse,
-                    "geburtsdatum": new_person.Geburtsdatum.isoformat(),
+                    "geburtsdatum": new_person.Geburtsdatum,
                     "titel": new_person.Titel
                 }), 201
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
+    @person_bp.route('/bulk', methods=['POST'])
+    def create_persons_bulk():
+        """Create many persons in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.PERSON, ['name', 'adresse_id', 'geburtsdatum', 'titel'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Person, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @person_bp.route('/<int:person_id>', methods=['PUT'])
     def update_person(person_id):
         """Update an existing person"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 person = session.execute(
                     select(tables.Person).where(tables.Person.id == person_id)
                 ).scalar_one_or_none()
@@ -150,7 +169,7 @@ def init_routes(db):
                     "id": person.id,
                     "name": person.Name,
                     "adresse_id": person.Adresse,
-                    "geburtsdatum": person.Geburtsdatum.isoformat(),
+                    "geburtsdatum": person.Geburtsdatum,
                     "titel": person.Titel
                 }), 200
         except Exception as e:
@@ -161,7 +180,7 @@ def init_routes(db):
     def delete_person(person_id):
         """Delete a person"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 person = session.execute(
                     select(tables.Person).where(tables.Person.id == person_id)
                 ).scalar_one_or_none()
@@ -1,27 +1,36 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
 
-products_bp = Blueprint('products', __name__, url_prefix='/api/products')
-
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    products_bp = Blueprint('products', __name__, url_prefix='/api/products')
     
     @products_bp.route('', methods=['GET'])
     def get_products():
         """Get all products"""
         try:
-            with db.session as session:
-                products = session.execute(select(tables.Produkt)).scalars().all()
-                result = []
-                for product in products:
-                    result.append({
-                        "id": product.id,
-                        "name": product.Bezeichnung,
-                        "price": float(product.Preis) if product.Preis else None
-                    })
-                return jsonify({"products": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.PRODUKT)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Produkt.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                products = page.trim(session.execute(
+                    page.apply(select(tables.Produkt).options(*fields.load_only()))
+                ).scalars().all())
+                result = [fields.serialize(product) for product in products]
+                return jsonify({"products": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -30,17 +39,18 @@ def init_routes(db):
     def get_product(product_id):
         """Get a single product by ID"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.PRODUKT)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 product = session.execute(
-                    select(tables.Produkt).where(tables.Produkt.id == product_id)
+                    select(tables.Produkt).options(*fields.load_only()).where(tables.Produkt.id == product_id)
                 ).scalar_one_or_none()
                 
                 if product:
-                    return jsonify({
-                        "id": product.id,
-                        "name": product.Bezeichnung,
-                        "price": float(product.Preis) if product.Preis else None
-                    }), 200
+                    return jsonify(fields.serialize(product)), 200
                 else:
                     return jsonify({"error": "Product not found"}), 404
         except Exception as e:
@@ -57,7 +67,7 @@ def init_routes(db):
             if not all(key in data for key in ['name', 'price']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_product = tables.Produkt(
                     Bezeichnung=data['name'],
                     Preis=data['price']
@@ -69,19 +79,37 @@ def init_routes(db):
                 return jsonify({
                     "id": new_product.id,
                     "name": new_product.Bezeichnung,
-                    "price": float(new_product.Preis)
+                    "price": new_product.Preis
                 }), 201
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
+    @products_bp.route('/bulk', methods=['POST'])
+    def create_products_bulk():
+        """Create many products in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.PRODUKT, ['name', 'price'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Produkt, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @products_bp.route('/<int:product_id>', methods=['PUT'])
     def update_product(product_id):
         """Update an existing product"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 product = session.execute(
                     select(tables.Produkt).where(tables.Produkt.id == product_id)
                 ).scalar_one_or_none()
@@ -101,7 +129,7 @@ def init_routes(db):
                 return jsonify({
                     "id": product.id,
                     "name": product.Bezeichnung,
-                    "price": float(product.Preis)
+                    "price": product.Preis
                 }), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -111,7 +139,7 @@ def init_routes(db):
     def delete_product(product_id):
         """Delete a product"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 product = session.execute(
                     select(tables.Produkt).where(tables.Produkt.id == product_id)
                 ).scalar_one_or_none()
@@ -1,111 +1,94 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, parse_datetime, insert_rows
+from backend.classes.pagination import KeysetPagination
+from backend.classes.streaming import wants_stream, ndjson_response
 from sqlalchemy import select
-from datetime import datetime
+from sqlalchemy.orm import joinedload
 
-protokoll_bp = Blueprint('protokoll', __name__, url_prefix='/api/protokoll')
+
+def protocol_to_dict(protocol, reference_cache, fields):
+    """Serialize the selected fields of a protocol with its (eager-loaded) appointment and cached appointment type"""
+    protocol_data = fields.serialize(protocol)
+    
+    termin = protocol.termin if 'termin' in fields else None
+    if termin:
+        termin_fields = fields.nested('termin')
+        protocol_data["termin"] = termin_fields.serialize(termin)
+        
+        art = reference_cache.get(tables.Terminart, termin.Art) if 'art' in termin_fields else None
+        if art:
+            protocol_data["termin"]["art"] = termin_fields.nested('art').serialize(art)
+    
+    return protocol_data
+
+
+def protocol_query(fields):
+    """select() of the protocols loading only the columns behind the selected fields"""
+    query = select(tables.Protokoll).options(*fields.load_only())
+    if 'termin' in fields:
+        query = query.options(
+            joinedload(tables.Protokoll.termin).options(*fields.nested('termin').load_only())
+        )
+    return query
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    protokoll_bp = Blueprint('protokoll', __name__, url_prefix='/api/protokoll')
     
     @protokoll_bp.route('', methods=['GET'])
     def get_protocols():
-        """Get all protocols with resolved appointment data"""
+        """
+        Get all protocols (appointment data with '?expand=termin,termin.art').
+
+        With '?stream=1' or 'Accept: application/x-ndjson' the complete table is
+        streamed as NDJSON instead (pagination parameters are ignored).
+        """
         try:
-            with db.session as session:
-                protocols = session.execute(select(tables.Protokoll)).scalars().all()
-                result = []
-                for protocol in protocols:
-                    # Resolve Termine foreign key
-                    termin = session.execute(
-                        select(tables.Termine).where(tables.Termine.id == protocol.Termin)
-                    ).scalar_one_or_none()
-                    
-                    protocol_data = {
-                        "id": protocol.id,
-                        "datum": protocol.Datum.isoformat() if protocol.Datum else None,
-                        "text": protocol.Text,
-                        "dauer": protocol.Dauer,
-                        "tldr": protocol.TLDR,
-                        "termin_id": protocol.Termin
-                    }
-                    
-                    if termin:
-                        # Also resolve Terminart for the termin
-                        art = session.execute(
-                            select(tables.Terminart).where(tables.Terminart.id == termin.Art)
-                        ).scalar_one_or_none()
-                        
-                        protocol_data["termin"] = {
-                            "id": termin.id,
-                            "title": termin.Titel,
-                            "ort": termin.Ort,
-                            "art_id": termin.Art,
-                            "start": termin.Start.isoformat() if termin.Start else None,
-                            "ende": termin.Ende.isoformat() if termin.Ende else None,
-                            "uid": termin.Uid
-                        }
-                        
-                        if art:
-                            protocol_data["termin"]["art"] = {
-                                "id": art.id,
-                                "name": art.Name
-                            }
-                    
-                    result.append(protocol_data)
-                return jsonify({"protocols": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.PROTOKOLL)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            if wants_stream(request):
+                return ndjson_response(
+                    db,
+                    protocol_query(fields).order_by(tables.Protokoll.id),
+                    lambda session, protocols: [protocol_to_dict(p, db.reference_cache, fields) for p in protocols]
+                )
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Protokoll.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                protocols = page.trim(session.execute(page.apply(protocol_query(fields))).scalars().all())
+                result = [protocol_to_dict(protocol, db.reference_cache, fields) for protocol in protocols]
+                return jsonify({"protocols": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @protokoll_bp.route('/<int:protocol_id>', methods=['GET'])
     def get_protocol(protocol_id):
-        """Get a single protocol by ID with resolved appointment data"""
+        """Get a single protocol by ID (appointment data with '?expand=termin,termin.art')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.PROTOKOLL)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 protocol = session.execute(
-                    select(tables.Protokoll).where(tables.Protokoll.id == protocol_id)
+                    protocol_query(fields).where(tables.Protokoll.id == protocol_id)
                 ).scalar_one_or_none()
                 
                 if protocol:
-                    # Resolve Termine foreign key
-                    termin = session.execute(
-                        select(tables.Termine).where(tables.Termine.id == protocol.Termin)
-                    ).scalar_one_or_none()
-                    
-                    protocol_data = {
-                        "id": protocol.id,
-                        "datum": protocol.Datum.isoformat() if protocol.Datum else None,
-                        "text": protocol.Text,
-                        "dauer": protocol.Dauer,
-                        "tldr": protocol.TLDR,
-                        "termin_id": protocol.Termin
-                    }
-                    
-                    if termin:
-                        # Also resolve Terminart for the termin
-                        art = session.execute(
-                            select(tables.Terminart).where(tables.Terminart.id == termin.Art)
-                        ).scalar_one_or_none()
-                        
-                        protocol_data["termin"] = {
-                            "id": termin.id,
-                            "title": termin.Titel,
-                            "ort": termin.Ort,
-                            "art_id": termin.Art,
-                            "start": termin.Start.isoformat() if termin.Start else None,
-                            "ende": termin.Ende.isoformat() if termin.Ende else None,
-                            "uid": termin.Uid
-                        }
-                        
-                        if art:
-                            protocol_data["termin"]["art"] = {
-                                "id": art.id,
-                                "name": art.Name
-                            }
-                    
-                    return jsonify(protocol_data), 200
+                    return jsonify(protocol_to_dict(protocol, db.reference_cache, fields)), 200
                 else:
                     return jsonify({"error": "Protocol not found"}), 404
         except Exception as e:
@@ -122,9 +105,9 @@ def init_routes(db):
             if not all(key in data for key in ['datum', 'text', 'dauer', 'tldr', 'termin_id']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 # Parse datetime
-                datum = datetime.fromisoformat(data['datum'])
+                datum = parse_datetime(data['datum'])
                 
                 new_protocol = tables.Protokoll(
                     Datum=datum,
@@ -139,7 +122,7 @@ def init_routes(db):
                 
                 return jsonify({
                     "id": new_protocol.id,
-                    "datum": new_protocol.Datum.isoformat(),
+                    "datum": new_protocol.Datum,
                     "text": new_protocol.Text,
                     "dauer": new_protocol.Dauer,
                     "tldr": new_protocol.TLDR,
@@ -149,13 +132,31 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @protokoll_bp.route('/bulk', methods=['POST'])
+    def create_protocols_bulk():
+        """Create many protocols in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.PROTOKOLL, ['datum', 'text', 'dauer', 'tldr', 'termin_id'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Protokoll, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @protokoll_bp.route('/<int:protocol_id>', methods=['PUT'])
     def update_protocol(protocol_id):
         """Update an existing protocol"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 protocol = session.execute(
                     select(tables.Protokoll).where(tables.Protokoll.id == protocol_id)
                 ).scalar_one_or_none()
@@ -165,7 +166,7 @@ def init_routes(db):
                 
                 # Update fields if provided
                 if 'datum' in data:
-                    protocol.Datum = datetime.fromisoformat(data['datum'])
+                    protocol.Datum = parse_datetime(data['datum'])
                 if 'text' in data:
                     protocol.Text = data['text']
                 if 'dauer' in data:
@@ -180,7 +181,7 @@ def init_routes(db):
                 
                 return jsonify({
                     "id": protocol.id,
-                    "datum": protocol.Datum.isoformat(),
+                    "datum": protocol.Datum,
                     "text": protocol.Text,
                     "dauer": protocol.Dauer,
                     "tldr": protocol.TLDR,
@@ -194,7 +195,7 @@ def init_routes(db):
     def delete_protocol(protocol_id):
         """Delete a protocol"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 protocol = session.execute(
                     select(tables.Protokoll).where(tables.Protokoll.id == protocol_id)
                 ).scalar_one_or_none()
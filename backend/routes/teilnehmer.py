@@ -1,136 +1,93 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
-teilnehmer_bp = Blueprint('teilnehmer', __name__, url_prefix='/api/teilnehmer')
+
+def participant_to_dict(participant, reference_cache, fields):
+    """Serialize the selected fields of a participant with its (eager-loaded) contact and appointment"""
+    participant_data = fields.serialize(participant)
+    
+    # Resolve Kontakt foreign key
+    kontakt = participant.kontakt if 'kontakt' in fields else None
+    if kontakt:
+        participant_data["kontakt"] = fields.nested('kontakt').serialize(kontakt)
+    
+    # Resolve Termine foreign key with nested Terminart from the reference cache
+    termin = participant.termin if 'termin' in fields else None
+    if termin:
+        termin_fields = fields.nested('termin')
+        participant_data["termin"] = termin_fields.serialize(termin)
+        
+        art = reference_cache.get(tables.Terminart, termin.Art) if 'art' in termin_fields else None
+        if art:
+            participant_data["termin"]["art"] = termin_fields.nested('art').serialize(art)
+    
+    return participant_data
+
+
+def participant_query(fields):
+    """select() of the participants loading only the columns behind the selected fields"""
+    query = select(tables.Teilnehmer).options(*fields.load_only())
+    if 'kontakt' in fields:
+        query = query.options(
+            joinedload(tables.Teilnehmer.kontakt).options(*fields.nested('kontakt').load_only())
+        )
+    if 'termin' in fields:
+        query = query.options(
+            joinedload(tables.Teilnehmer.termin).options(*fields.nested('termin').load_only())
+        )
+    return query
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    teilnehmer_bp = Blueprint('teilnehmer', __name__, url_prefix='/api/teilnehmer')
     
     @teilnehmer_bp.route('', methods=['GET'])
     def get_participants():
-        """Get all participants with resolved contact and appointment data"""
+        """Get all participants (contact and appointment data with '?expand=kontakt,termin,termin.art')"""
         try:
-            with db.session as session:
-                participants = session.execute(select(tables.Teilnehmer)).scalars().all()
-                result = []
-                for participant in participants:
-                    participant_data = {
-                        "id": participant.id,
-                        "kontakt_id": participant.Kontakt,
-                        "termin_id": participant.Termin,
-                        "istHaupt": participant.istHaupt
-                    }
-                    
-                    # Resolve Kontakt foreign key with nested Person/Unternehmen
-                    kontakt = session.execute(
-                        select(tables.Kontakt).where(tables.Kontakt.id == participant.Kontakt)
-                    ).scalar_one_or_none()
-                    
-                    if kontakt:
-                        participant_data["kontakt"] = {
-                            "id": kontakt.id,
-                            "email": kontakt.EMail,
-                            "telefonnummer": kontakt.Telefonnummer,
-                            "rolle": kontakt.Rolle,
-                            "person_id": kontakt.PersonId,
-                            "unternehmen_id": kontakt.UnternehmenId,
-                            "ref_typ": kontakt.RefTyp
-                        }
-                    
-                    # Resolve Termine foreign key with nested Terminart
-                    termin = session.execute(
-                        select(tables.Termine).where(tables.Termine.id == participant.Termin)
-                    ).scalar_one_or_none()
-                    
-                    if termin:
-                        art = session.execute(
-                            select(tables.Terminart).where(tables.Terminart.id == termin.Art)
-                        ).scalar_one_or_none()
-                        
-                        participant_data["termin"] = {
-                            "id": termin.id,
-                            "title": termin.Titel,
-                            "ort": termin.Ort,
-                            "art_id": termin.Art,
-                            "start": termin.Start.isoformat() if termin.Start else None,
-                            "ende": termin.Ende.isoformat() if termin.Ende else None,
-                            "uid": termin.Uid
-                        }
-                        
-                        if art:
-                            participant_data["termin"]["art"] = {
-                                "id": art.id,
-                                "name": art.Name
-                            }
-                    
-                    result.append(participant_data)
-                return jsonify({"participants": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.TEILNEHMER)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Teilnehmer.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                participants = page.trim(session.execute(
+                    page.apply(participant_query(fields))
+                ).scalars().all())
+                result = [participant_to_dict(participant, db.reference_cache, fields) for participant in participants]
+                return jsonify({"participants": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @teilnehmer_bp.route('/<int:participant_id>', methods=['GET'])
     def get_participant(participant_id):
-        """Get a single participant by ID with resolved contact and appointment data"""
+        """Get a single participant by ID (contact and appointment data with '?expand=kontakt,termin,termin.art')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.TEILNEHMER)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 participant = session.execute(
-                    select(tables.Teilnehmer).where(tables.Teilnehmer.id == participant_id)
+                    participant_query(fields).where(tables.Teilnehmer.id == participant_id)
                 ).scalar_one_or_none()
                 
                 if participant:
-                    participant_data = {
-                        "id": participant.id,
-                        "kontakt_id": participant.Kontakt,
-                        "termin_id": participant.Termin,
-                        "istHaupt": participant.istHaupt
-                    }
-                    
-                    # Resolve Kontakt foreign key with nested Person/Unternehmen
-                    kontakt = session.execute(
-                        select(tables.Kontakt).where(tables.Kontakt.id == participant.Kontakt)
-                    ).scalar_one_or_none()
-                    
-                    if kontakt:
-                        participant_data["kontakt"] = {
-                            "id": kontakt.id,
-                            "email": kontakt.EMail,
-                            "telefonnummer": kontakt.Telefonnummer,
-                            "rolle": kontakt.Rolle,
-                            "person_id": kontakt.PersonId,
-                            "unternehmen_id": kontakt.UnternehmenId,
-                            "ref_typ": kontakt.RefTyp
-                        }
-                    
-                    # Resolve Termine foreign key with nested Terminart
-                    termin = session.execute(
-                        select(tables.Termine).where(tables.Termine.id == participant.Termin)
-                    ).scalar_one_or_none()
-                    
-                    if termin:
-                        art = session.execute(
-                            select(tables.Terminart).where(tables.Terminart.id == termin.Art)
-                        ).scalar_one_or_none()
-                        
-                        participant_data["termin"] = {
-                            "id": termin.id,
-                            "title": termin.Titel,
-                            "ort": termin.Ort,
-                            "art_id": termin.Art,
-                            "start": termin.Start.isoformat() if termin.Start else None,
-                            "ende": termin.Ende.isoformat() if termin.Ende else None,
-                            "uid": termin.Uid
-                        }
-                        
-                        if art:
-                            participant_data["termin"]["art"] = {
-                                "id": art.id,
-                                "name": art.Name
-                            }
-                    
-                    return jsonify(participant_data), 200
+                    return jsonify(participant_to_dict(participant, db.reference_cache, fields)), 200
                 else:
                     return jsonify({"error": "Participant not found"}), 404
         except Exception as e:
@@ -147,7 +104,7 @@ def init_routes(db):
             if not all(key in data for key in ['kontakt_id', 'termin_id', 'istHaupt']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_participant = tables.Teilnehmer(
                     Kontakt=data['kontakt_id'],
                     Termin=data['termin_id'],
@@ -167,13 +124,31 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @teilnehmer_bp.route('/bulk', methods=['POST'])
+    def create_participants_bulk():
+        """Create many participants in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.TEILNEHMER, ['kontakt_id', 'termin_id', 'istHaupt'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Teilnehmer, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @teilnehmer_bp.route('/<int:participant_id>', methods=['PUT'])
     def update_participant(participant_id):
         """Update an existing participant"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 participant = session.execute(
                     select(tables.Teilnehmer).where(tables.Teilnehmer.id == participant_id)
                 ).scalar_one_or_none()
@@ -206,7 +181,7 @@ def init_routes(db):
     def delete_participant(participant_id):
         """Delete a participant"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 participant = session.execute(
                     select(tables.Teilnehmer).where(tables.Teilnehmer.id == participant_id)
                 ).scalar_one_or_none()
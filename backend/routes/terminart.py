@@ -1,26 +1,36 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
 
-terminart_bp = Blueprint('terminart', __name__, url_prefix='/api/terminart')
-
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    terminart_bp = Blueprint('terminart', __name__, url_prefix='/api/terminart')
     
     @terminart_bp.route('', methods=['GET'])
     def get_appointment_types():
         """Get all appointment types"""
         try:
-            with db.session as session:
-                types = session.execute(select(tables.Terminart)).scalars().all()
-                result = []
-                for type_obj in types:
-                    result.append({
-                        "id": type_obj.id,
-                        "name": type_obj.Name
-                    })
-                return jsonify({"appointment_types": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.TERMINART)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Terminart.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                types = page.trim(session.execute(
+                    page.apply(select(tables.Terminart).options(*fields.load_only()))
+                ).scalars().all())
+                result = [fields.serialize(type_obj) for type_obj in types]
+                return jsonify({"appointment_types": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -29,16 +39,18 @@ def init_routes(db):
     def get_appointment_type(type_id):
         """Get a single appointment type by ID"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.TERMINART)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 type_obj = session.execute(
-                    select(tables.Terminart).where(tables.Terminart.id == type_id)
+                    select(tables.Terminart).options(*fields.load_only()).where(tables.Terminart.id == type_id)
                 ).scalar_one_or_none()
                 
                 if type_obj:
-                    return jsonify({
-                        "id": type_obj.id,
-                        "name": type_obj.Name
-                    }), 200
+                    return jsonify(fields.serialize(type_obj)), 200
                 else:
                     return jsonify({"error": "Appointment type not found"}), 404
         except Exception as e:
@@ -55,12 +67,13 @@ def init_routes(db):
             if 'name' not in data:
                 return jsonify({"error": "Missing required field: name"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_type = tables.Terminart(
                     Name=data['name']
                 )
                 session.add(new_type)
                 session.commit()
+                db.reference_cache.invalidate(tables.Terminart)
                 session.refresh(new_type)
                 
                 return jsonify({
@@ -71,13 +84,32 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @terminart_bp.route('/bulk', methods=['POST'])
+    def create_appointment_types_bulk():
+        """Create many appointment types in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.TERMINART, ['name'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Terminart, rows)
+                session.commit()
+                db.reference_cache.invalidate(tables.Terminart)
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @terminart_bp.route('/<int:type_id>', methods=['PUT'])
     def update_appointment_type(type_id):
         """Update an existing appointment type"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 type_obj = session.execute(
                     select(tables.Terminart).where(tables.Terminart.id == type_id)
                 ).scalar_one_or_none()
@@ -90,6 +122,7 @@ def init_routes(db):
                     type_obj.Name = data['name']
                 
                 session.commit()
+                db.reference_cache.invalidate(tables.Terminart)
                 session.refresh(type_obj)
                 
                 return jsonify({
@@ -104,7 +137,7 @@ def init_routes(db):
     def delete_appointment_type(type_id):
         """Delete an appointment type"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 type_obj = session.execute(
                     select(tables.Terminart).where(tables.Terminart.id == type_id)
                 ).scalar_one_or_none()
@@ -114,6 +147,7 @@ def init_routes(db):
                 
                 session.delete(type_obj)
                 session.commit()
+                db.reference_cache.invalidate(tables.Terminart)
                 
                 return jsonify({"message": "Appointment type deleted successfully"}), 200
         except Exception as e:
@@ -1,90 +1,109 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
-from sqlalchemy import select
-from datetime import datetime
-
-termine_bp = Blueprint('termine', __name__, url_prefix='/api/termine')
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, parse_datetime, insert_rows, upsert_rows, MAX_UPSERT_ITEMS, UPSERT_DIALECTS
+from backend.classes.pagination import KeysetPagination
+from sqlalchemy import select, func
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    termine_bp = Blueprint('termine', __name__, url_prefix='/api/termine')
     
     @termine_bp.route('', methods=['GET'])
     def get_appointments():
-        """Get all appointments with resolved appointment type data"""
+        """
+        Get all appointments (appointment type data with '?expand=art').
+
+        Optional query parameters 'from' and 'to' (ISO 8601) restrict the result
+        to appointments overlapping that time range. Appointments are ordered by
+        the highest importance of their orders (descending), then by Start and id;
+        pages continue in that order.
+        """
         try:
-            with db.session as session:
-                appointments = session.execute(select(tables.Termine)).scalars().all()
-                orders = session.execute(select(tables.Auftrag)).scalars().all()
+            try:
+                range_from = parse_datetime(request.args['from']) if 'from' in request.args else None
+                range_to = parse_datetime(request.args['to']) if 'to' in request.args else None
+            except ValueError:
+                return jsonify({"error": "Invalid 'from' or 'to' parameter, expected ISO 8601"}), 400
+
+            try:
+                fields = FieldSelection.from_request(request.args, schema.TERMINE, extra=('wichtigkeit_id',))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            # Highest importance among the orders referencing each appointment
+            order_importance = (
+                select(
+                    tables.Auftrag.terminid,
+                    func.max(tables.Auftrag.wichtigkeit).label('wichtigkeit')
+                )
+                .group_by(tables.Auftrag.terminid)
+                .subquery()
+            )
+            wichtigkeit_id = func.coalesce(order_importance.c.wichtigkeit, -1).label('wichtigkeit_id')
+
+            try:
+                page = KeysetPagination.from_request(
+                    request.args, wichtigkeit_id.desc(), tables.Termine.Start, tables.Termine.id
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                query = (
+                    select(tables.Termine, wichtigkeit_id)
+                    .options(*fields.load_only(tables.Termine.Start))
+                    .outerjoin(order_importance, order_importance.c.terminid == tables.Termine.id)
+                )
+                # Overlap with [from, to), served by the (Start, Ende) index
+                if range_to is not None:
+                    query = query.where(tables.Termine.Start < range_to)
+                if range_from is not None:
+                    query = query.where(tables.Termine.Ende > range_from)
+
+                rows = page.trim(session.execute(page.apply(query)).all(), entity=lambda row: row[0])
                 result = []
-                for appointment in appointments:
-                    # Resolve Terminart foreign key
-                    art = session.execute(
-                        select(tables.Terminart).where(tables.Terminart.id == appointment.Art)
-                    ).scalar_one_or_none()
-                    
-                    appointment_data = {
-                        "id": appointment.id,
-                        "title": appointment.Titel,
-                        "ort": appointment.Ort,
-                        "art_id": appointment.Art,
-                        "start": appointment.Start.isoformat() if appointment.Start else None,
-                        "ende": appointment.Ende.isoformat() if appointment.Ende else None,
-                        "uid": appointment.Uid
-                    }
-                    
+                for appointment, importance in rows:
+                    appointment_data = fields.serialize(appointment)
+
+                    # Terminart comes from the in-process reference cache
+                    art = db.reference_cache.get(tables.Terminart, appointment.Art) if 'art' in fields else None
                     if art:
-                        appointment_data["art"] = {
-                            "id": art.id,
-                            "name": art.Name
-                        }
-
-                    appointment_data["wichtigkeit_id"] = -1
-
-                    for order in orders:
-                        if order.terminid == appointment.id:
-                            if order.wichtigkeit:
-                                appointment_data["wichtigkeit_id"] = order.wichtigkeit
-                            break
+                        appointment_data["art"] = fields.nested('art').serialize(art)
+
+                    if 'wichtigkeit_id' in fields:
+                        appointment_data["wichtigkeit_id"] = importance
                     
                     result.append(appointment_data)
-                result.sort(key=lambda x: (-x.get("wichtigkeit_id", -1), x.get("start") or ""))
 
-                return jsonify({"appointments": result, "count": len(result)}), 200
+                return jsonify({"appointments": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @termine_bp.route('/<int:appointment_id>', methods=['GET'])
     def get_appointment(appointment_id):
-        """Get a single appointment by ID with resolved appointment type data"""
+        """Get a single appointment by ID (appointment type data with '?expand=art')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.TERMINE)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 appointment = session.execute(
-                    select(tables.Termine).where(tables.Termine.id == appointment_id)
+                    select(tables.Termine).options(*fields.load_only()).where(tables.Termine.id == appointment_id)
                 ).scalar_one_or_none()
                 
                 if appointment:
-                    # Resolve Terminart foreign key
-                    art = session.execute(
-                        select(tables.Terminart).where(tables.Terminart.id == appointment.Art)
-                    ).scalar_one_or_none()
-                    
-                    appointment_data = {
-                        "id": appointment.id,
-                        "title": appointment.Titel,
-                        "ort": appointment.Ort,
-                        "art_id": appointment.Art,
-                        "start": appointment.Start.isoformat() if appointment.Start else None,
-                        "ende": appointment.Ende.isoformat() if appointment.Ende else None,
-                        "uid": appointment.Uid
-                    }
+                    appointment_data = fields.serialize(appointment)
                     
+                    # Resolve Terminart foreign key from the reference cache
+                    art = db.reference_cache.get(tables.Terminart, appointment.Art) if 'art' in fields else None
                     if art:
-                        appointment_data["art"] = {
-                            "id": art.id,
-                            "name": art.Name
-                        }
+                        appointment_data["art"] = fields.nested('art').serialize(art)
                     
                     return jsonify(appointment_data), 200
                 else:
@@ -103,10 +122,10 @@ def init_routes(db):
             if not all(key in data for key in ['title', 'ort', 'art_id', 'start', 'ende', 'uid']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 # Parse datetime
-                start = datetime.fromisoformat(data['start'])
-                ende = datetime.fromisoformat(data['ende'])
+                start = parse_datetime(data['start'])
+                ende = parse_datetime(data['ende'])
                 
                 new_appointment = tables.Termine(
                     Titel=data['title'],
@@ -125,21 +144,71 @@ def init_routes(db):
                     "title": new_appointment.Titel,
                     "ort": new_appointment.Ort,
                     "art_id": new_appointment.Art,
-                    "start": new_appointment.Start.isoformat(),
-                    "ende": new_appointment.Ende.isoformat(),
+                    "start": new_appointment.Start,
+                    "ende": new_appointment.Ende,
                     "uid": new_appointment.Uid
                 }), 201
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
+    @termine_bp.route('/bulk', methods=['POST'])
+    def create_appointments_bulk():
+        """Create many appointments in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.TERMINE, ['title', 'ort', 'art_id', 'start', 'ende', 'uid'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Termine, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
+    @termine_bp.route('/bulk', methods=['PUT'])
+    def upsert_appointments_bulk():
+        """
+        Insert or update many appointments identified by their 'uid' (calendar sync).
+
+        Appointments with an unknown uid are created, existing ones are
+        overwritten with the given values. Returns the numbers of inserted,
+        updated and unchanged appointments.
+        """
+        try:
+            if db.engine.dialect.name not in UPSERT_DIALECTS:
+                return jsonify({"error": f"Upsert is not supported for {db.engine.dialect.name}"}), 501
+
+            try:
+                rows = parse_items(
+                    request.get_json(),
+                    schema.TERMINE,
+                    ['title', 'ort', 'art_id', 'start', 'ende', 'uid'],
+                    max_items=MAX_UPSERT_ITEMS
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                counts = upsert_rows(session, tables.Termine, rows, 'Uid')
+                session.commit()
+                
+                return jsonify(counts), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @termine_bp.route('/<int:appointment_id>', methods=['PUT'])
     def update_appointment(appointment_id):
         """Update an existing appointment"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 appointment = session.execute(
                     select(tables.Termine).where(tables.Termine.id == appointment_id)
                 ).scalar_one_or_none()
@@ -155,9 +224,9 @@ def init_routes(db):
                 if 'art_id' in data:
                     appointment.Art = data['art_id']
                 if 'start' in data:
-                    appointment.Start = datetime.fromisoformat(data['start'])
+                    appointment.Start = parse_datetime(data['start'])
                 if 'ende' in data:
-                    appointment.Ende = datetime.fromisoformat(data['ende'])
+                    appointment.Ende = parse_datetime(data['ende'])
                 if 'uid' in data:
                     appointment.Uid = data['uid']
                 
@@ -169,8 +238,8 @@ def init_routes(db):
                     "title": appointment.Titel,
                     "ort": appointment.Ort,
                     "art_id": appointment.Art,
-                    "start": appointment.Start.isoformat(),
-                    "ende": appointment.Ende.isoformat(),
+                    "start": appointment.Start,
+                    "ende": appointment.Ende,
                     "uid": appointment.Uid
                 }), 200
         except Exception as e:
@@ -181,7 +250,7 @@ def init_routes(db):
     def delete_appointment(appointment_id):
         """Delete an appointment"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 appointment = session.execute(
                     select(tables.Termine).where(tables.Termine.id == appointment_id)
                 ).scalar_one_or_none()
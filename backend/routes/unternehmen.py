@@ -1,78 +1,81 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
-unternehmen_bp = Blueprint('unternehmen', __name__, url_prefix='/api/unternehmen')
+
+def unternehmen_query(fields):
+    """select() of the companies loading only the columns behind the selected fields"""
+    query = select(tables.Unternehmen).options(*fields.load_only())
+    if 'adresse' in fields:
+        query = query.options(
+            joinedload(tables.Unternehmen.adresse).options(*fields.nested('adresse').load_only())
+        )
+    return query
 
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    unternehmen_bp = Blueprint('unternehmen', __name__, url_prefix='/api/unternehmen')
     
     @unternehmen_bp.route('', methods=['GET'])
     def get_companies():
-        """Get all companies with resolved address data"""
+        """Get all companies (address data with '?expand=adresse')"""
         try:
-            with db.session as session:
-                companies = session.execute(select(tables.Unternehmen)).scalars().all()
+            try:
+                fields = FieldSelection.from_request(request.args, schema.UNTERNEHMEN)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Unternehmen.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                companies = page.trim(session.execute(
+                    page.apply(unternehmen_query(fields))
+                ).scalars().all())
                 result = []
                 for company in companies:
-                    # Resolve Adresse foreign key
-                    adresse = session.execute(
-                        select(tables.Adresse).where(tables.Adresse.id == company.Adresse)
-                    ).scalar_one_or_none()
-                    
-                    company_data = {
-                        "id": company.id,
-                        "name": company.Name,
-                        "adresse_id": company.Adresse,
-                        "umsatz": company.Umsatz
-                    }
+                    company_data = fields.serialize(company)
                     
+                    # Resolve Adresse foreign key
+                    adresse = company.adresse if 'adresse' in fields else None
                     if adresse:
-                        company_data["adresse"] = {
-                            "id": adresse.id,
-                            "plz": adresse.Plz,
-                            "ortsname": adresse.ortsname,
-                            "strasse": adresse.Strasse,
-                            "hausnr": adresse.Hausnr
-                        }
+                        company_data["adresse"] = fields.nested('adresse').serialize(adresse)
                     
                     result.append(company_data)
-                return jsonify({"companies": result, "count": len(result)}), 200
+                return jsonify({"companies": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
     @unternehmen_bp.route('/<int:company_id>', methods=['GET'])
     def get_company(company_id):
-        """Get a single company by ID with resolved address data"""
+        """Get a single company by ID (address data with '?expand=adresse')"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.UNTERNEHMEN)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 company = session.execute(
-                    select(tables.Unternehmen).where(tables.Unternehmen.id == company_id)
+                    unternehmen_query(fields).where(tables.Unternehmen.id == company_id)
                 ).scalar_one_or_none()
                 
                 if company:
-                    # Resolve Adresse foreign key
-                    adresse = session.execute(
-                        select(tables.Adresse).where(tables.Adresse.id == company.Adresse)
-                    ).scalar_one_or_none()
-                    
-                    company_data = {
-                        "id": company.id,
-                        "name": company.Name,
-                        "adresse_id": company.Adresse,
-                        "umsatz": company.Umsatz
-                    }
+                    company_data = fields.serialize(company)
                     
+                    # Resolve Adresse foreign key
+                    adresse = company.adresse if 'adresse' in fields else None
                     if adresse:
-                        company_data["adresse"] = {
-                            "id": adresse.id,
-                            "plz": adresse.Plz,
-                            "ortsname": adresse.ortsname,
-                            "strasse": adresse.Strasse,
-                            "hausnr": adresse.Hausnr
-                        }
+                        company_data["adresse"] = fields.nested('adresse').serialize(adresse)
                     
                     return jsonify(company_data), 200
                 else:
@@ -91,7 +94,7 @@ def init_routes(db):
             if not all(key in data for key in ['name', 'adresse_id', 'umsatz']):
                 return jsonify({"error": "Missing required fields"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_company = tables.Unternehmen(
                     Name=data['name'],
                     Adresse=data['adresse_id'],
@@ -111,13 +114,31 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @unternehmen_bp.route('/bulk', methods=['POST'])
+    def create_companies_bulk():
+        """Create many companies in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.UNTERNEHMEN, ['name', 'adresse_id', 'umsatz'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Unternehmen, rows)
+                session.commit()
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @unternehmen_bp.route('/<int:company_id>', methods=['PUT'])
     def update_company(company_id):
         """Update an existing company"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 company = session.execute(
                     select(tables.Unternehmen).where(tables.Unternehmen.id == company_id)
                 ).scalar_one_or_none()
@@ -150,7 +171,7 @@ def init_routes(db):
     def delete_company(company_id):
         """Delete a company"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 company = session.execute(
                     select(tables.Unternehmen).where(tables.Unternehmen.id == company_id)
                 ).scalar_one_or_none()
@@ -1,26 +1,36 @@
 from flask import Blueprint, jsonify, request
 import backend.classes.tables as tables
+import backend.classes.schema as schema
+from backend.classes.fields import FieldSelection
+from backend.classes.bulk import parse_items, insert_rows
+from backend.classes.pagination import KeysetPagination
 from sqlalchemy import select
 
-wichtigkeit_bp = Blueprint('wichtigkeit', __name__, url_prefix='/api/wichtigkeit')
-
 
 def init_routes(db):
     """Initialize routes with database instance"""
+    wichtigkeit_bp = Blueprint('wichtigkeit', __name__, url_prefix='/api/wichtigkeit')
     
     @wichtigkeit_bp.route('', methods=['GET'])
     def get_importances():
         """Get all importance levels"""
         try:
-            with db.session as session:
-                importances = session.execute(select(tables.Wichtigkeit)).scalars().all()
-                result = []
-                for importance in importances:
-                    result.append({
-                        "id": importance.id,
-                        "level": importance.level
-                    })
-                return jsonify({"importance_levels": result, "count": len(result)}), 200
+            try:
+                fields = FieldSelection.from_request(request.args, schema.WICHTIGKEIT)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                page = KeysetPagination.from_request(request.args, tables.Wichtigkeit.id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
+                importances = page.trim(session.execute(
+                    page.apply(select(tables.Wichtigkeit).options(*fields.load_only()))
+                ).scalars().all())
+                result = [fields.serialize(importance) for importance in importances]
+                return jsonify({"importance_levels": result, "count": len(result), "next": page.next}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -29,16 +39,18 @@ def init_routes(db):
     def get_importance(importance_id):
         """Get a single importance level by ID"""
         try:
-            with db.session as session:
+            try:
+                fields = FieldSelection.from_request(request.args, schema.WICHTIGKEIT)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with db.Session() as session:
                 importance = session.execute(
-                    select(tables.Wichtigkeit).where(tables.Wichtigkeit.id == importance_id)
+                    select(tables.Wichtigkeit).options(*fields.load_only()).where(tables.Wichtigkeit.id == importance_id)
                 ).scalar_one_or_none()
                 
                 if importance:
-                    return jsonify({
-                        "id": importance.id,
-                        "level": importance.level
-                    }), 200
+                    return jsonify(fields.serialize(importance)), 200
                 else:
                     return jsonify({"error": "Importance level not found"}), 404
         except Exception as e:
@@ -55,12 +67,13 @@ def init_routes(db):
             if 'level' not in data:
                 return jsonify({"error": "Missing required field: level"}), 400
             
-            with db.session as session:
+            with db.Session() as session:
                 new_importance = tables.Wichtigkeit(
                     level=data['level']
                 )
                 session.add(new_importance)
                 session.commit()
+                db.reference_cache.invalidate(tables.Wichtigkeit)
                 session.refresh(new_importance)
                 
                 return jsonify({
@@ -71,13 +84,32 @@ def init_routes(db):
             return jsonify({"error": str(e)}), 500
 
 
+    @wichtigkeit_bp.route('/bulk', methods=['POST'])
+    def create_importances_bulk():
+        """Create many importance levels in one transaction from a JSON array, returns the new ids"""
+        try:
+            try:
+                rows = parse_items(request.get_json(), schema.WICHTIGKEIT, ['level'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            with db.Session() as session:
+                ids = insert_rows(session, tables.Wichtigkeit, rows)
+                session.commit()
+                db.reference_cache.invalidate(tables.Wichtigkeit)
+                
+                return jsonify({"ids": ids, "count": len(ids)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
     @wichtigkeit_bp.route('/<int:importance_id>', methods=['PUT'])
     def update_importance(importance_id):
         """Update an existing importance level"""
         try:
             data = request.get_json()
             
-            with db.session as session:
+            with db.Session() as session:
                 importance = session.execute(
                     select(tables.Wichtigkeit).where(tables.Wichtigkeit.id == importance_id)
                 ).scalar_one_or_none()
@@ -90,6 +122,7 @@ def init_routes(db):
                     importance.level = data['level']
                 
                 session.commit()
+                db.reference_cache.invalidate(tables.Wichtigkeit)
                 session.refresh(importance)
                 
                 return jsonify({
@@ -104,7 +137,7 @@ def init_routes(db):
     def delete_importance(importance_id):
         """Delete an importance level"""
         try:
-            with db.session as session:
+            with db.Session() as session:
                 importance = session.execute(
                     select(tables.Wichtigkeit).where(tables.Wichtigkeit.id == importance_id)
                 ).scalar_one_or_none()
@@ -114,6 +147,7 @@ def init_routes(db):
                 
                 session.delete(importance)
                 session.commit()
+                db.reference_cache.invalidate(tables.Wichtigkeit)
                 
                 return jsonify({"message": "Importance level deleted successfully"}), 200
         except Exception as e:
@@ -1,4 +1,7 @@
+import argparse
+import os
 import sys
+import tempfile
 
 def test():
     from sqlalchemy import select
@@ -11,21 +14,111 @@ def test():
     db.connect()
 
     products = select(tables.Produkt).where(tables.Produkt.id == 1)
-    with db.session as session:
+    with db.Session() as session:
         result = session.execute(products).scalar_one_or_none()
         if result:
             print(f"Product ID: {result.id}, Name: {result.Bezeichnung}, Price: {result.Preis}")
         else:
             print("No product found with ID 1.")
 
+def create_indexes():
+    import backend.classes.aiven as aiven
+    aiven_env = aiven.AivenEnvironment()
+    db = aiven.AivenDatabase(aiven_env)
+    db.connect()
+
+    for name in db.create_indexes():
+        print(f"Index ensured: {name}")
+
+def serve(args):
+    """Run the API under gunicorn with multiple worker processes."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("Error: gunicorn is not installed. Please install it with '(uv) pip install gunicorn' or 'uv sync --extra server'.")
+        sys.exit(1)
+
+    # Workers write their metrics to files in this directory, aggregated by
+    # /metrics; must be set before the workers import prometheus_client
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir is None:
+        metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='mobsys-metrics-')
+    else:
+        # Samples of a previous run would be added to the new ones
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            if name.endswith('.db'):
+                os.remove(os.path.join(metrics_dir, name))
+
+    # The in-memory response cache is per process: a write handled by one
+    # worker would not invalidate the entries of the others
+    from dotenv import load_dotenv
+    load_dotenv()
+    if args.workers > 1 and not os.environ.get('RESPONSE_CACHE_URL'):
+        os.environ['RESPONSE_CACHE_ENABLED'] = 'false'
+        print("Response cache disabled: set RESPONSE_CACHE_URL=redis://... to share it between the workers.")
+
+    def child_exit(server, worker):
+        from backend.classes.metrics import mark_process_dead
+        mark_process_dead(worker.pid)
+
+    class BackendApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Called in each worker after fork (preload_app is off); the engine
+            # is created lazily, so every worker gets its own connection pool
+            from backend.app import create_app
+            return create_app()
+
+    BackendApplication({
+        'bind': f"{args.host}:{args.port}",
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': args.timeout,
+        'preload_app': False,
+        'accesslog': '-',
+        'child_exit': child_exit,
+    }).run()
+
 def main():
-    from backend.app import app
+    from backend.app import create_app
+    app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5001)
 
 
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="mobsys-backend-api")
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('test', help="Test the database connection")
+    commands.add_parser('create-indexes', help="Create missing database indexes")
+
+    serve_parser = commands.add_parser('serve', help="Run the production WSGI server")
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=5001)
+    serve_parser.add_argument('--workers', type=int, default=(os.cpu_count() or 1) * 2 + 1,
+                              help="Number of worker processes (default: 2 * CPUs + 1)")
+    serve_parser.add_argument('--threads', type=int, default=4,
+                              help="Number of threads per worker (default: 4)")
+    serve_parser.add_argument('--timeout', type=int, default=30,
+                              help="Seconds before a silent worker is restarted (default: 30)")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "test":
+    args = parse_args(sys.argv[1:])
+    if args.command == "test":
         test()
+    elif args.command == "create-indexes":
+        create_indexes()
+    elif args.command == "serve":
+        serve(args)
     else:
         main()